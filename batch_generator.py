@@ -0,0 +1,185 @@
+"""
+Generate many dashboard variants in parallel from a single load of the dataset.
+
+A variant spec is a dict (or a JSON list of them via --specs):
+
+    {"name": "europe_inflation", "continent": "Europe", "indicator": "Inflation",
+     "years": [1990, 2020], "frame_mode": "encoded"}
+
+Only "name" is required; "continent" filters the `state` column, "years" is an
+inclusive range and any other keys are passed through to generate_map(). Derived
+layers (ranks, percentiles, rolling windows, the GDP index) are computed on the full
+panel before the filters, so a ranking in a continent variant is still the world rank.
+
+The dataset is loaded once and written to an uncompressed Arrow IPC file that
+every worker memory-maps, so workers filter their slice in Arrow and only
+materialize the rows they need. Without pyarrow, workers receive the DataFrame
+once each through the pool initializer.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from columnar_store import PARQUET_PATH, has_pyarrow, read_parquet
+from derived_indicators import DERIVED_INDICATORS
+from figure_builder import DEFAULT_INDICATOR
+from map_generator import DATA_PATH, generate_map, map_columns, map_panel
+
+OUTPUT_DIR = "variants"
+
+# Set in each worker by _init_worker: ("arrow", path) or ("frame", DataFrame)
+_shared = None
+
+
+def load_dataset():
+    if os.path.exists(PARQUET_PATH) and has_pyarrow():
+        return read_parquet(PARQUET_PATH)
+    return pd.read_csv(DATA_PATH)
+
+
+def _write_shared_arrow(df, path):
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df.sort_values('Year', kind='stable'), preserve_index=False)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _init_worker(shared):
+    global _shared
+    _shared = shared
+
+
+def with_derived_column(df, indicator):
+    """`df` plus the derived `indicator` column, computed on the panel of all of df's rows."""
+    panel = map_panel(df, indicator)
+    return df.assign(**{indicator: panel.lookup(indicator, df['ISO_Code'], df['Year'])})
+
+
+def _filter_frame(df, continent, years):
+    if continent is not None:
+        df = df[df['state'] == continent]
+    if years is not None:
+        df = df[(df['Year'] >= years[0]) & (df['Year'] <= years[1])]
+    return df
+
+
+def _variant_frame(spec):
+    """
+    Rows and columns one variant needs, filtered before conversion to pandas where
+    possible. A derived indicator is computed before filtering, so its variant reads
+    every row.
+    """
+    indicator = spec.get("indicator", DEFAULT_INDICATOR)
+    columns = map_columns(indicator)
+    continent = spec.get("continent")
+    years = spec.get("years")
+    if indicator in DERIVED_INDICATORS:
+        read_columns = columns + (['state'] if continent is not None else [])
+        df = with_derived_column(_read_shared(read_columns), indicator)
+        return _filter_frame(df, continent, years)[columns + [indicator]]
+    return _read_shared(columns, continent, years)
+
+
+def _read_shared(columns, continent=None, years=None):
+    kind, source = _shared
+    if kind == "arrow":
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        with pa.memory_map(source, "r") as mapped:
+            table = pa.ipc.open_file(mapped).read_all()
+            mask = None
+            if continent is not None:
+                mask = pc.equal(table['state'], continent)
+            if years is not None:
+                in_range = pc.and_(pc.greater_equal(table['Year'], years[0]), pc.less_equal(table['Year'], years[1]))
+                mask = in_range if mask is None else pc.and_(mask, in_range)
+            if mask is not None:
+                table = table.filter(mask)
+            return table.select(columns).to_pandas()
+    return _filter_frame(source, continent, years)[columns]
+
+
+def _render_variant(spec, output_dir):
+    start = time.perf_counter()
+    df = _variant_frame(spec)
+    loaded = time.perf_counter()
+
+    name = spec["name"]
+    options = {key: value for key, value in spec.items() if key not in ("name", "continent", "years")}
+    if options.get("history_mode") == "lazy":
+        options.setdefault("history_dir", f"{name}_history")
+    output_file = os.path.join(output_dir, f"{name}.html")
+    if df.empty:
+        return {"name": name, "rows": 0, "error": "no rows match this variant"}
+    with contextlib.redirect_stdout(io.StringIO()):
+        generate_map(df, output_file=output_file, **options)
+    done = time.perf_counter()
+    return {
+        "name": name,
+        "rows": len(df),
+        "load_seconds": loaded - start,
+        "render_seconds": done - loaded,
+        "seconds": done - start,
+        "bytes": os.path.getsize(output_file),
+        "output": output_file,
+    }
+
+
+def generate_variants(specs, df=None, output_dir=OUTPUT_DIR, processes=None):
+    """Render every spec in a process pool; returns per-variant timing dicts in spec order."""
+    names = [spec["name"] for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError("Variant names must be unique")
+    os.makedirs(output_dir, exist_ok=True)
+    if df is None:
+        df = load_dataset()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if has_pyarrow():
+            shared_path = os.path.join(tmp, "dataset.arrow")
+            _write_shared_arrow(df, shared_path)
+            shared = ("arrow", shared_path)
+        else:
+            shared = ("frame", df)
+
+        results = {}
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(shared,)) as pool:
+            futures = {pool.submit(_render_variant, spec, output_dir): spec["name"] for spec in specs}
+            for future in as_completed(futures):
+                result = future.result()
+                results[result["name"]] = result
+                if "error" in result:
+                    print(f"{result['name']:<30} skipped: {result['error']}")
+                else:
+                    print(f"{result['name']:<30} {result['rows']:>8} rows  {result['seconds']:7.2f}s"
+                          f"  {result['bytes'] / 2**20:6.2f} MiB")
+    return [results[name] for name in names]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate dashboard variants in parallel.")
+    parser.add_argument("--specs", required=True, help="JSON file with a list of variant specs")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--processes", type=int, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    with open(args.specs, encoding="utf-8") as f:
+        specs = json.load(f)
+    start = time.perf_counter()
+    generate_variants(specs, output_dir=args.output_dir, processes=args.processes)
+    print(f"Generated {len(specs)} variants in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""
+Offline benchmarks for the data_processor and map_generator hot paths.
+
+    python benchmark.py                          # bundled datasets/
+    python benchmark.py --countries 5000         # synthetic panel, 5000 x 41 rows
+    python benchmark.py --countries 500 --years 200   # synthetic panel, 500 x 200 rows
+    python benchmark.py --save-baseline          # record results as the new baseline
+    python benchmark.py --threshold 0.3          # fail on >30% regressions
+
+Every stage is timed separately (best of --repeat runs) and run once more under
+tracemalloc for its peak memory. Stages that resolve ISO codes start every run from
+the same cold resolver cache; resolve_iso3_warm times the fully cached lookup. Results are compared against the stored baseline
+for the same scenario and the script exits with status 1 on a regression.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import data_processor
+import iso_resolver
+from classification import classify, real_growth
+from history_builder import build_country_history
+from map_generator import generate_map
+
+BASELINE_PATH = ".cache/benchmark_baseline.json"
+BUNDLED_GDP = "datasets/gdp_1960_2020.csv"
+BUNDLED_INFLATION = "datasets/global_inflation_data.csv"
+
+
+def year_range(years=None):
+    """(first, last) year of a benchmark panel: the processed range, or `years` years from YEAR_START."""
+    if years is None:
+        return data_processor.YEAR_START, data_processor.YEAR_END
+    return data_processor.YEAR_START, data_processor.YEAR_START + years - 1
+
+
+def synthetic_panels(countries, seed=0, years=None):
+    """
+    Raw GDP (long) and inflation (wide) frames shaped like the Kaggle sources, over
+    year_range(years). Real country names are used first; beyond those, synthetic
+    "Region NNNNN" names are generated and pre-seeded into the ISO cache so the
+    resolver does not fuzzy-search thousands of names that can never match.
+    """
+    rng = np.random.default_rng(seed)
+    real_names = pd.read_csv(BUNDLED_INFLATION, usecols=['country_name'])['country_name'].dropna().unique().tolist()
+    names = real_names[:countries] + [f"Region {i:05d}" for i in range(max(0, countries - len(real_names)))]
+    first, last = year_range(years)
+    years = np.arange(first, last + 1)
+
+    country_col = np.repeat(np.array(names, dtype=object), len(years))
+    year_col = np.tile(years, len(names))
+    growth = rng.normal(1.05, 0.08, size=(len(names), len(years)))
+    gdp = (rng.uniform(1e8, 1e12, size=(len(names), 1)) * np.cumprod(growth, axis=1)).ravel()
+    gdp_df = pd.DataFrame({
+        'year': year_col,
+        'rank': 0,
+        'country': country_col,
+        'state': rng.choice(['Asia', 'Europe', 'Africa', 'America', 'Oceania'], size=len(country_col)),
+        'gdp': gdp.round(),
+        'gdp_percent': 0.0
+    })
+
+    inflation = rng.lognormal(1.2, 1.0, size=(len(names), len(years))) - 2
+    inflation_df = pd.DataFrame(inflation.round(2), columns=[str(year) for year in years])
+    inflation_df.insert(0, 'indicator_name', data_processor.INFLATION_INDICATOR)
+    inflation_df.insert(0, 'country_name', names)
+
+    seeded = {name: f"R{i:05d}" for i, name in enumerate(names[len(real_names):])}
+    return gdp_df, inflation_df, seeded
+
+
+def measure(func, repeat, setup=None):
+    """
+    Best wall time over `repeat` runs, then one traced run for peak memory.
+    setup() runs untimed before every run, e.g. to reset a cache.
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, {"seconds": min(timings), "peak_bytes": peak}
+
+
+def output_size(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, str) and os.path.exists(value):
+        return os.path.getsize(value)
+    return len(json.dumps(value, default=str))
+
+
+def run_benchmarks(gdp_raw, inflation_raw, repeat, cache_path, include_html=True, seeded=None, years=None):
+    """
+    Time every stage. cache_path is the ISO resolver cache the stages use; it is
+    reset to `seeded` (names pre-resolved by synthetic_panels) before every cold run.
+    """
+    results = {}
+    year_start, year_end = year_range(years)
+
+    def cold_cache():
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+        if seeded:
+            iso_resolver.save_cache(seeded, cache_path)
+
+    def record(name, func, setup=None):
+        value, stats = measure(func, repeat, setup)
+        stats["output_bytes"] = output_size(value)
+        results[name] = stats
+        print(f"{name:<18} {stats['seconds'] * 1000:10.1f} ms  peak {stats['peak_bytes'] / 2**20:8.1f} MiB"
+              f"  output {stats['output_bytes'] / 2**20:8.2f} MiB")
+        return value
+
+    gdp = record("process_gdp", lambda: data_processor.process_gdp(gdp_raw, year_start, year_end))
+    inflation = record("process_inflation", lambda: data_processor.process_inflation(
+        inflation_raw, year_start=year_start, year_end=year_end))
+    joined = pd.merge(gdp, inflation, on=['Country', 'Year'], how='inner')
+
+    def resolve():
+        return iso_resolver.resolve_iso3(joined['Country'], cache_path=cache_path)
+    record("resolve_iso3", resolve, setup=cold_cache)
+    record("resolve_iso3_warm", resolve)
+
+    def classification():
+        frame = joined.assign(Real_GDP_Growth=real_growth(joined['GDP_Growth'], joined['Inflation']))
+        return classify(frame)
+    record("classification", classification)
+
+    merged = record("merge_data", lambda: data_processor.merge_data(gdp, inflation), setup=cold_cache)
+    final = data_processor.finalize_data(merged)
+    record("history", lambda: build_country_history(final))
+
+    if include_html:
+        with tempfile.TemporaryDirectory() as tmp:
+            html_path = os.path.join(tmp, "map.html")
+
+            def html():
+                generate_map(final, output_file=html_path)
+                return html_path
+            record("generate_map", html)
+    return results
+
+
+def compare(results, baseline, threshold, min_seconds=0.05):
+    """
+    Metrics that got worse than baseline * (1 + threshold). Timing changes smaller
+    than min_seconds are ignored so millisecond-level noise can't fail a run.
+    """
+    regressions = []
+    for stage, stats in results.items():
+        previous = baseline.get(stage)
+        if not previous:
+            continue
+        for metric in ["seconds", "peak_bytes"]:
+            if metric == "seconds" and stats[metric] - previous[metric] < min_seconds:
+                continue
+            if previous[metric] > 0 and stats[metric] > previous[metric] * (1 + threshold):
+                change = stats[metric] / previous[metric] - 1
+                regressions.append(f"{stage}.{metric}: {previous[metric]:.4g} -> {stats[metric]:.4g} (+{change:.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1], formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--countries", type=int, help="use a synthetic panel with this many countries instead of datasets/")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--years", type=int, help="synthetic panel length in years, starting at YEAR_START (with --countries)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown / memory growth")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="ignore slowdowns smaller than this")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--skip-html", action="store_true", help="skip generate_map (slow for very large panels)")
+    args = parser.parse_args(argv)
+
+    if args.years is not None and not args.countries:
+        parser.error("--years needs --countries")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep benchmark runs away from the real resolver cache
+        cache_path = os.path.join(tmp, "iso3_cache.json")
+        seeded = None
+        if args.countries:
+            scenario = f"synthetic-{args.countries}-seed{args.seed}"
+            if args.years is not None:
+                scenario += f"-years{args.years}"
+            gdp_raw, inflation_raw, seeded = synthetic_panels(args.countries, args.seed, args.years)
+        else:
+            scenario = "bundled"
+            gdp_raw, inflation_raw = pd.read_csv(BUNDLED_GDP), pd.read_csv(BUNDLED_INFLATION)
+
+        print(f"Scenario {scenario}: {len(gdp_raw)} GDP rows, {len(inflation_raw)} inflation rows")
+        previous_cache_path = iso_resolver.CACHE_PATH
+        iso_resolver.CACHE_PATH = cache_path
+        try:
+            results = run_benchmarks(gdp_raw, inflation_raw, args.repeat, cache_path,
+                                     include_html=not args.skip_html, seeded=seeded, years=args.years)
+        finally:
+            iso_resolver.CACHE_PATH = previous_cache_path
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baselines = json.load(f)
+
+    if args.save_baseline:
+        baselines[scenario] = results
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2)
+        print(f"Baseline for {scenario} saved to {args.baseline}")
+        return 0
+
+    if scenario not in baselines:
+        print(f"No baseline for {scenario} yet (run with --save-baseline)")
+        return 0
+    regressions = compare(results, baselines[scenario], args.threshold, args.min_seconds)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if regressions:
+        return 1
+    print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import operator
+
+import numpy as np
+import pandas as pd
+
+UNKNOWN = "Unknown"
+DEFAULT_CONDITION = "Other"
+
+_OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+# Evaluated top to bottom, the first matching rule wins.
+# Each clause is (column, operator, threshold) and all clauses of a rule must hold.
+CONDITION_RULES = [
+    ("Hyperinflation", [("Inflation", ">", 100)]),
+    ("Deflation", [("Inflation", "<", 0)]),
+    ("Stagflation", [("Inflation", ">", 5), ("Real_GDP_Growth", "<", 1)]),
+    ("Overheating", [("Inflation", ">", 5), ("Real_GDP_Growth", ">", 5)]),
+    ("Healthy Growth", [("Inflation", ">=", 0), ("Inflation", "<=", 5), ("Real_GDP_Growth", ">", 3)]),
+    ("Steady Growth", [("Inflation", ">=", 0), ("Inflation", "<=", 5), ("Real_GDP_Growth", ">", 0), ("Real_GDP_Growth", "<=", 3)]),
+    ("Recession", [("Real_GDP_Growth", "<=", 0)]),
+]
+
+# Columns that must be present for a row to be classified at all
+REQUIRED_COLUMNS = ["Inflation", "Real_GDP_Growth"]
+
+
+def register_condition(name, clauses, before=None):
+    """Add a new condition rule, optionally ahead of an existing one so it takes priority."""
+    for column, op, _ in clauses:
+        if op not in _OPERATORS:
+            raise ValueError(f"Unsupported operator {op!r} for column {column!r}")
+    rule = (name, list(clauses))
+    if before is None:
+        CONDITION_RULES.append(rule)
+    else:
+        names = [existing for existing, _ in CONDITION_RULES]
+        CONDITION_RULES.insert(names.index(before), rule)
+
+
+def real_growth(nominal_growth, inflation):
+    """Real GDP growth: ((1 + Nominal/100) / (1 + Inflation/100) - 1) * 100, NaN if either input is missing."""
+    nominal = np.asarray(nominal_growth, dtype="float64")
+    inf = np.asarray(inflation, dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return ((1 + nominal / 100) / (1 + inf / 100) - 1) * 100
+
+
+def classify(df, rules=None):
+    """Label every row with the first matching condition rule using np.select."""
+    rules = CONDITION_RULES if rules is None else rules
+    needed = REQUIRED_COLUMNS + [column for _, clauses in rules for column, _, _ in clauses]
+    columns = {column: df[column].to_numpy(dtype="float64", na_value=np.nan) for column in dict.fromkeys(needed)}
+
+    unknown = np.zeros(len(df), dtype=bool)
+    for column in REQUIRED_COLUMNS:
+        unknown |= np.isnan(columns[column])
+
+    condlist = [unknown]
+    choicelist = [UNKNOWN]
+    for name, clauses in rules:
+        mask = np.ones(len(df), dtype=bool)
+        for column, op, threshold in clauses:
+            mask &= _OPERATORS[op](columns[column], threshold)
+        condlist.append(mask)
+        choicelist.append(name)
+
+    labels = np.select(condlist, choicelist, default=DEFAULT_CONDITION)
+    return pd.Series(labels.astype(object), index=df.index)
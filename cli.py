@@ -0,0 +1,399 @@
+"""
+Single entry point for the pipeline scripts.
+
+    python cli.py process [--streaming] [--fail-fast] [--report report.json] [--force]
+    python cli.py append --gdp gdp_2021.csv
+    python cli.py generate [--indicator Inflation] [--frame-mode encoded] [--compress gzip] [--force]
+    python cli.py validate [--inputs]
+    python cli.py stats [--countries]
+    python cli.py conditions [--export analytics/]
+    python cli.py --import-times stats
+
+Only the standard library is imported up front; pandas, plotly, pyarrow and
+pycountry are imported by the subcommand that needs them. process and generate
+write a stamp into .cache/stamps/ recording the content hash of every input file
+and local module they used, the options and the outputs they produced. While
+none of those have changed, the next run exits without importing anything heavy.
+"""
+import argparse
+import builtins
+import json
+import os
+import sys
+import time
+
+from pipeline import file_digest
+
+STAMP_DIR = ".cache/stamps"
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# --- import timing ---------------------------------------------------------
+
+class ImportTimer:
+    """Wraps __import__ and attributes the self time of every first import to its top-level package."""
+
+    def __init__(self):
+        self.totals = {}
+        self._stack = []
+        self._original = builtins.__import__
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+        frame = [name.split(".")[0], time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - frame[1]
+            self.totals[frame[0]] = self.totals.get(frame[0], 0.0) + elapsed - frame[2]
+            if self._stack:
+                self._stack[-1][2] += elapsed
+
+    def __enter__(self):
+        builtins.__import__ = self._import
+        return self
+
+    def __exit__(self, *exc):
+        builtins.__import__ = self._original
+
+    def report(self, limit=15):
+        total = sum(self.totals.values())
+        print(f"Import time: {total:.3f}s")
+        for name, seconds in sorted(self.totals.items(), key=lambda item: item[1], reverse=True)[:limit]:
+            print(f"  {name:<24} {seconds * 1000:8.1f} ms")
+
+
+# --- up-to-date stamps -----------------------------------------------------
+
+def _stamp_path(command):
+    return os.path.join(STAMP_DIR, f"{command}.json")
+
+
+def _local_modules():
+    """Source files of the repo modules imported so far."""
+    paths = []
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if path and path.endswith(".py") and os.path.dirname(os.path.abspath(path)) == HERE:
+            paths.append(os.path.abspath(path))
+    return sorted(paths)
+
+
+def _output_state(path):
+    if os.path.isdir(path):
+        return {name: _output_state(os.path.join(path, name)) for name in sorted(os.listdir(path))}
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def is_up_to_date(command, options):
+    """True if the stamp matches the options and no recorded input or output has changed."""
+    try:
+        with open(_stamp_path(command), encoding="utf-8") as f:
+            stamp = json.load(f)
+        if stamp["options"] != options:
+            return False
+        if any(file_digest(path) != digest for path, digest in stamp["inputs"].items()):
+            return False
+        return all(_output_state(path) == state for path, state in stamp["outputs"].items())
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def write_stamp(command, options, inputs, outputs):
+    files = list(inputs) + _local_modules()
+    stamp = {
+        "options": options,
+        "inputs": {path: file_digest(path) for path in files},
+        "outputs": {path: _output_state(path) for path in outputs if os.path.exists(path)},
+    }
+    os.makedirs(STAMP_DIR, exist_ok=True)
+    tmp_path = _stamp_path(command) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(stamp, f, indent=1)
+    os.replace(tmp_path, _stamp_path(command))
+
+
+def refresh_stamp_outputs(command):
+    """Record the current state of a stamp's outputs, after they were updated on purpose (e.g. by append)."""
+    try:
+        with open(_stamp_path(command), encoding="utf-8") as f:
+            stamp = json.load(f)
+    except (OSError, ValueError):
+        return
+    stamp["outputs"] = {path: _output_state(path) for path in stamp.get("outputs", {}) if os.path.exists(path)}
+    tmp_path = _stamp_path(command) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(stamp, f, indent=1)
+    os.replace(tmp_path, _stamp_path(command))
+
+
+def input_paths(args):
+    """(gdp, inflation) paths: --gdp/--inflation when given, the dataset registry for the rest."""
+    paths = {"gdp": args.gdp, "inflation": args.inflation}
+    missing = [name for name, path in paths.items() if not path]
+    if missing:
+        from dataset_registry import fetch_all
+
+        paths.update(fetch_all(missing))
+    return paths["gdp"], paths["inflation"]
+
+
+# --- subcommands -----------------------------------------------------------
+
+def cmd_process(args):
+    gdp_path, inflation_path = input_paths(args)
+    options = {"gdp": os.path.abspath(gdp_path), "inflation": os.path.abspath(inflation_path),
+               "streaming": args.streaming, "fail_fast": args.fail_fast}
+    if not args.force and is_up_to_date("process", options):
+        print("Processed data is up to date.")
+        return 0
+
+    from incremental import appended_years
+
+    appended = appended_years()
+    if appended and not args.discard_appended:
+        print(f"The processed data has appended years {appended} (cli.py append), which a full "
+              f"run would drop. Re-run with --discard-appended, then append those years again.")
+        return 1
+
+    import data_processor
+    from columnar_store import PARQUET_PATH
+    from incremental import build_state, save_state
+    from instrumentation import traced_run
+    from validation import ValidationError, validate_inputs
+
+    data_processor.GDP_PATH, data_processor.INFLATION_PATH = gdp_path, inflation_path
+    with traced_run("data_processor"):
+        gdp, inflation = data_processor.load_data(streaming=args.streaming)
+        gdp_clean = data_processor.process_gdp(gdp)
+        inflation_clean = data_processor.process_inflation(inflation)
+        try:
+            report = validate_inputs(gdp_clean, inflation_clean, gdp_raw=gdp, inflation_raw=inflation,
+                                     fail_fast=args.fail_fast)
+        except ValidationError as e:
+            report = e.report
+        print(report.summary())
+        if args.report:
+            report.write_json(args.report)
+        if args.fail_fast and not report.ok:
+            print("Stopping before merge_data: fix the errors above or run without --fail-fast.")
+            return 1
+        chunksize = data_processor.CHUNK_SIZE if args.streaming else None
+        final_df = data_processor.finalize_data(data_processor.merge_data(gdp_clean, inflation_clean, chunksize))
+        data_processor.save_data(final_df)
+        save_state(build_state(gdp_clean))
+    write_stamp("process", options, [gdp_path, inflation_path], [data_processor.OUTPUT_PATH, PARQUET_PATH])
+    return 0
+
+
+def cmd_append(args):
+    import pandas as pd
+
+    from dataset_registry import fetch
+    from incremental import append_years
+    from instrumentation import traced_run
+
+    with traced_run("append"):
+        gdp_raw = pd.read_csv(args.gdp)
+        inflation_raw = pd.read_csv(args.inflation or fetch("inflation"))
+        append_years(gdp_raw, inflation_raw)
+    refresh_stamp_outputs("process")
+    return 0
+
+
+def cmd_generate(args):
+    options = {"indicator": args.indicator, "frame_mode": args.frame_mode, "history_mode": args.history_mode,
+               "compact_history": args.compact_history, "compress": args.compress, "analytics": args.analytics, "output": args.output}
+    if not args.force and is_up_to_date("generate", options):
+        print("Dashboard is up to date.")
+        return 0
+
+    # Checked here rather than with choices=: the registry lives in figure_builder (plotly),
+    # which the up-to-date check above must not import. No stamp is ever written for a bad name.
+    from figure_builder import INDICATORS
+    if args.indicator is not None and args.indicator not in INDICATORS:
+        args.parser.error(f"argument --indicator: invalid choice: {args.indicator!r} (choose from {', '.join(INDICATORS)})")
+
+    import map_generator
+    from columnar_store import PARQUET_PATH, has_pyarrow
+    from instrumentation import traced_run
+
+    indicator = args.indicator or map_generator.DEFAULT_INDICATOR
+    output_file = args.output or map_generator.OUTPUT_FILE
+    with traced_run("map_generator"):
+        map_generator.generate_map(output_file=output_file, compact_history=args.compact_history,
+                                   history_mode=args.history_mode, frame_mode=args.frame_mode, indicator=indicator,
+                                   compress=args.compress, analytics=args.analytics)
+    data_path = PARQUET_PATH if os.path.exists(PARQUET_PATH) and has_pyarrow() else map_generator.DATA_PATH
+    if os.path.exists(data_path):
+        sidecars = [output_file + suffix for suffix in (".gz", ".br")] if args.compress else []
+        write_stamp("generate", options, [data_path], [output_file] + sidecars)
+    return 0
+
+
+def _load_dataset():
+    from columnar_store import PARQUET_PATH, has_pyarrow, read_parquet
+
+    if os.path.exists(PARQUET_PATH) and has_pyarrow():
+        return read_parquet(PARQUET_PATH)
+    import pandas as pd
+    from map_generator import DATA_PATH
+    return pd.read_csv(DATA_PATH)
+
+
+def validate_inputs_command(args):
+    import pandas as pd
+
+    import data_processor
+    from validation import validate_inputs
+
+    gdp_path, inflation_path = input_paths(args)
+    gdp = pd.read_csv(gdp_path)
+    inflation = pd.read_csv(inflation_path)
+    report = validate_inputs(data_processor.process_gdp(gdp), data_processor.process_inflation(inflation),
+                             gdp_raw=gdp, inflation_raw=inflation)
+    print(report.summary())
+    if args.report:
+        report.write_json(args.report)
+        print(f"Report written to {args.report}")
+    return 0 if report.ok else 1
+
+
+def cmd_validate(args):
+    if args.inputs:
+        return validate_inputs_command(args)
+    from classification import CONDITION_RULES, DEFAULT_CONDITION, UNKNOWN
+    from data_processor import YEAR_END, YEAR_START
+    from incremental import load_state
+
+    try:
+        # Appended years extend the range past YEAR_END
+        year_end = max(YEAR_END, load_state()["year_end"])
+    except (OSError, ValueError, KeyError):
+        year_end = YEAR_END
+    df = _load_dataset()
+    errors, warnings = [], []
+    expected = ['Country', 'Year', 'GDP', 'GDP_Growth', 'Inflation', 'ISO_Code', 'Real_GDP_Growth', 'Economic_Condition']
+    missing = [column for column in expected if column not in df.columns]
+    if missing:
+        errors.append(f"missing columns: {missing}")
+    else:
+        if df['ISO_Code'].isna().any():
+            errors.append(f"{int(df['ISO_Code'].isna().sum())} rows without ISO_Code")
+        out_of_range = ~df['Year'].between(YEAR_START, year_end)
+        if out_of_range.any():
+            errors.append(f"{int(out_of_range.sum())} rows outside {YEAR_START}-{year_end}")
+        known = {name for name, _ in CONDITION_RULES} | {DEFAULT_CONDITION, UNKNOWN}
+        unknown = set(df['Economic_Condition'].dropna().unique()) - known
+        if unknown:
+            errors.append(f"unknown Economic_Condition values: {sorted(unknown)}")
+        duplicates = int(df.duplicated(['ISO_Code', 'Year']).sum())
+        if duplicates:
+            warnings.append(f"{duplicates} duplicate (ISO_Code, Year) rows")
+
+    for message in warnings:
+        print(f"WARNING {message}")
+    for message in errors:
+        print(f"ERROR {message}")
+    print(f"{len(df)} rows checked: {len(errors)} error(s), {len(warnings)} warning(s)")
+    return 1 if errors else 0
+
+
+def cmd_stats(args):
+    df = _load_dataset()
+    print(f"Rows:      {len(df)}")
+    print(f"Countries: {df['ISO_Code'].nunique()}")
+    print(f"Years:     {int(df['Year'].min())}-{int(df['Year'].max())}")
+    print("Economic conditions:")
+    for condition, count in df['Economic_Condition'].value_counts().items():
+        print(f"  {condition:<16} {count:6d}")
+    if args.countries:
+        names = df.drop_duplicates('ISO_Code').sort_values('ISO_Code')
+        for iso, name in zip(names['ISO_Code'], names['Country']):
+            print(f"{iso}  {name}")
+    return 0
+
+
+def cmd_conditions(args):
+    from condition_analytics import condition_analytics
+
+    analytics = condition_analytics(_load_dataset())
+    print("Condition spells (years):")
+    print(analytics.spell_summary().round(2).to_string())
+    print()
+    print("Next-year transition probabilities:")
+    print(analytics.transition_matrix(normalize=True).to_string(float_format="{:.2f}".format))
+    if args.export:
+        os.makedirs(args.export, exist_ok=True)
+        analytics.spells().to_csv(os.path.join(args.export, "condition_spells.csv"), index=False)
+        analytics.transition_matrix().to_csv(os.path.join(args.export, "condition_transitions.csv"))
+        analytics.counts().to_csv(os.path.join(args.export, "condition_counts.csv"))
+        print(f"Wrote spells, transitions and counts to {args.export}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Economic dashboard pipeline.")
+    parser.add_argument("--import-times", action="store_true", help="report import time per package on exit")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    process = commands.add_parser("process", help="clean and merge the raw datasets")
+    process.add_argument("--gdp", help="GDP csv (default: from the dataset registry)")
+    process.add_argument("--inflation", help="inflation csv (default: from the dataset registry)")
+    process.add_argument("--streaming", action="store_true", help="read the raw files in chunks and join them out of core")
+    process.add_argument("--fail-fast", action="store_true", help="stop before merging if input validation finds an error")
+    process.add_argument("--report", help="write the input validation report as JSON")
+    process.add_argument("--force", action="store_true", help="run even if the outputs are up to date")
+    process.add_argument("--discard-appended", action="store_true",
+                         help="rebuild even though the outputs hold years added by append (they are dropped)")
+    process.set_defaults(func=cmd_process)
+
+    append = commands.add_parser("append", help="append years after the last processed one")
+    append.add_argument("--gdp", required=True, help="GDP csv with the new years (same layout as the source)")
+    append.add_argument("--inflation", help="inflation csv covering the new years (default: from the dataset registry)")
+    append.set_defaults(func=cmd_append)
+
+    generate = commands.add_parser("generate", help="build the interactive dashboard")
+    generate.add_argument("--indicator", help="map layer (default: Real_GDP_Growth)")
+    generate.add_argument("--frame-mode", choices=["plotly", "encoded"], default="plotly")
+    generate.add_argument("--history-mode", choices=["inline", "lazy"], default="inline")
+    generate.add_argument("--compact-history", action="store_true")
+    generate.add_argument("--analytics", action="store_true", help="add the condition spells/transitions panel")
+    generate.add_argument("--compress", choices=["gzip", "br"], help="also write a precompressed .gz / .br copy")
+    generate.add_argument("--output", help="HTML file (default: interactive_economic_map.html)")
+    generate.add_argument("--force", action="store_true", help="run even if the output is up to date")
+    generate.set_defaults(func=cmd_generate, parser=generate)
+
+    validate = commands.add_parser("validate", help="check the processed dataset")
+    validate.add_argument("--inputs", action="store_true", help="screen the raw inputs instead (before merging)")
+    validate.add_argument("--gdp", help="with --inputs: GDP csv (default: from the dataset registry)")
+    validate.add_argument("--inflation", help="with --inputs: inflation csv (default: from the dataset registry)")
+    validate.add_argument("--report", help="with --inputs: write the report as JSON")
+    validate.set_defaults(func=cmd_validate)
+
+    stats = commands.add_parser("stats", help="summarize the processed dataset")
+    stats.add_argument("--countries", action="store_true", help="also list every country")
+    stats.set_defaults(func=cmd_stats)
+
+    conditions = commands.add_parser("conditions", help="Economic_Condition spells and transitions")
+    conditions.add_argument("--export", metavar="DIR", help="also write the spells, transitions and counts as CSV")
+    conditions.set_defaults(func=cmd_conditions)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.import_times:
+        return args.func(args)
+    with ImportTimer() as timer:
+        status = args.func(args)
+    timer.report()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Columnar copy of the processed dataset: a directory of Parquet files, one per year.
+
+    datasets/economic_data_1980_2020.parquet/
+        year-1980.parquet
+        year-1981.parquet
+        ...
+
+Every part holds all columns, with Country/ISO_Code/Economic_Condition/state
+dictionary-encoded. Reading the parts in name order yields rows sorted by Year,
+selecting years only opens their files, and appending a year writes one new file
+without touching the existing ones.
+"""
+import os
+import shutil
+
+import numpy as np
+
+PARQUET_PATH = "datasets/economic_data_1980_2020.parquet"
+PART_PREFIX = "year-"
+PART_SUFFIX = ".parquet"
+
+# Low-cardinality string columns stored dictionary-encoded
+DICTIONARY_COLUMNS = ['Country', 'ISO_Code', 'Economic_Condition', 'state']
+
+
+def has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def part_name(year):
+    return f"{PART_PREFIX}{int(year):04d}{PART_SUFFIX}"
+
+
+def part_years(path=PARQUET_PATH):
+    """{year: part file path} of a dataset directory, in year order."""
+    parts = {}
+    for name in sorted(os.listdir(path)):
+        if name.startswith(PART_PREFIX) and name.endswith(PART_SUFFIX):
+            year = name[len(PART_PREFIX):-len(PART_SUFFIX)]
+            if year.isdigit():
+                parts[int(year)] = os.path.join(path, name)
+    return parts
+
+
+def write_parquet(df, path=PARQUET_PATH):
+    """
+    Write the processed dataset as one file per year. The new directory is built next
+    to `path` and swapped in at the end, replacing an older directory or a single-file
+    dataset written by earlier versions.
+    """
+    df, table = _sorted_table(df)
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+    _write_year_parts(tmp_path, table, df['Year'].to_numpy())
+
+    old_path = path + ".old"
+    if os.path.isdir(old_path):
+        shutil.rmtree(old_path)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    if os.path.isdir(old_path):
+        shutil.rmtree(old_path)
+    elif os.path.exists(old_path):
+        os.remove(old_path)
+    return path
+
+
+def _sorted_table(df):
+    import pyarrow as pa
+
+    df = df.sort_values('Year', kind='stable').reset_index(drop=True)
+    for column in DICTIONARY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return df, table.replace_schema_metadata({**(table.schema.metadata or {}), b'sorted_by': b'Year'})
+
+
+def _write_part(path, table):
+    import pyarrow.parquet as pq
+
+    dictionary_columns = [column for column in DICTIONARY_COLUMNS if column in table.schema.names]
+    tmp_path = path + ".tmp"
+    pq.write_table(table, tmp_path, use_dictionary=dictionary_columns, compression='zstd')
+    os.replace(tmp_path, path)
+
+
+def _write_year_parts(directory, table, years):
+    # Row offsets where a new year starts (data is sorted, so each year is one contiguous run)
+    boundaries = [0] + (np.flatnonzero(np.diff(years)) + 1).tolist() + [len(years)]
+    for start, end in zip(boundaries[:-1], boundaries[1:]):
+        if end > start:
+            _write_part(os.path.join(directory, part_name(years[start])), table.slice(start, end - start))
+
+
+def append_parquet(df, path=PARQUET_PATH):
+    """
+    Add the rows of years not yet in the dataset directory `path`, one new part file
+    per year; existing parts are left as they are. Raises ValueError if `df` has a
+    year the dataset already holds.
+    """
+    import pyarrow.parquet as pq
+
+    parts = part_years(path)
+    overlap = sorted(set(df['Year'].unique().tolist()) & set(parts))
+    if overlap:
+        raise ValueError(f"{path} already holds years {overlap}")
+    schema = pq.read_schema(next(iter(parts.values()))) if parts else None
+    if schema is not None:
+        df = df[schema.names]
+    df, table = _sorted_table(df)
+    if schema is not None:
+        table = _match_schema(table, schema)
+    _write_year_parts(path, table, df['Year'].to_numpy())
+    return path
+
+
+def _match_schema(table, schema):
+    """Cast columns to the existing parts' types where that is lossless (e.g. int64 GDP stays
+    float64 if the new years have fractions; read_parquet promotes the parts on read)."""
+    import pyarrow as pa
+
+    columns = []
+    for field in schema:
+        column = table[field.name]
+        try:
+            column = column.cast(field.type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            pass
+        columns.append(column)
+    return pa.Table.from_arrays(columns, names=schema.names).replace_schema_metadata(schema.metadata)
+
+
+def read_parquet(path=PARQUET_PATH, columns=None, years=None):
+    """
+    Memory-map the dataset, reading only the requested columns and (optionally) the
+    parts of years in the inclusive range `years`. A single-file dataset from earlier
+    versions is read as well.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if os.path.isfile(path):
+        filters = None
+        if years is not None:
+            filters = [('Year', '>=', years[0]), ('Year', '<=', years[1])]
+        return pq.read_table(path, columns=columns, filters=filters, memory_map=True).to_pandas()
+
+    parts = part_years(path)
+    if not parts:
+        raise FileNotFoundError(f"No year parts in {path}")
+    selected = [part for year, part in parts.items() if years is None or years[0] <= year <= years[1]]
+    if not selected:
+        # Still return the right columns, from the schema of any part
+        schema = pq.read_schema(next(iter(parts.values())))
+        if columns is not None:
+            schema = pa.schema([schema.field(column) for column in columns], metadata=schema.metadata)
+        return schema.empty_table().to_pandas()
+    tables = [pq.read_table(part, columns=columns, memory_map=True) for part in selected]
+    return pa.concat_tables(tables, promote_options="permissive").to_pandas()
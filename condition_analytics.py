@@ -0,0 +1,196 @@
+"""
+Economic_Condition sequence analytics on the [country x year] panel.
+
+The condition label grid is read as one row-major array of codes. A spell (a run of
+the same condition in consecutive years) starts wherever a code differs from the
+one before it, a new country begins or the year axis has a gap. Transitions are the
+(code[t], code[t + 1]) pairs of adjacent years, counted with one bincount per year.
+The whole computation is a few array expressions, whatever the number of countries.
+Results are cached on disk keyed by a hash of the label grid and of this module's code.
+
+    analytics = condition_analytics(df)
+    analytics.spells()                          # one row per spell
+    analytics.transition_matrix(normalize=True) # P(next condition | condition)
+    analytics.counts()                          # countries per condition per year
+"""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from classification import CONDITION_RULES, DEFAULT_CONDITION, UNKNOWN
+from panel_store import as_panel
+from pipeline import code_digest
+
+CACHE_DIR = ".cache/conditions"
+CONDITION_COLUMN = 'Economic_Condition'
+
+
+def condition_names():
+    """Every label classify() can assign, in rule order."""
+    return [name for name, _ in CONDITION_RULES] + [DEFAULT_CONDITION, UNKNOWN]
+
+
+def consecutive(years):
+    """bool per year-axis position j > 0: years[j] directly follows years[j - 1]."""
+    return np.diff(years) == 1
+
+
+def run_lengths(codes, years):
+    """
+    Run-length encode every row of a [country x year] code grid (-1 = no row).
+    Returns (country, code, start, length) arrays, one entry per spell, where start is
+    a year-axis position. Missing years and gaps in the year axis end a spell.
+    """
+    n, m = codes.shape
+    flat = codes.ravel()
+    starts = np.ones((n, m), dtype=bool)
+    if m > 1:
+        starts[:, 1:] = (codes[:, 1:] != codes[:, :-1]) | ~consecutive(years)
+    start_index = np.flatnonzero(starts.ravel())
+    lengths = np.diff(np.append(start_index, flat.size))
+    spell_codes = flat[start_index]
+    keep = spell_codes >= 0
+    start_index = start_index[keep]
+    return start_index // m, spell_codes[keep], start_index % m, lengths[keep]
+
+
+def transitions_by_year(codes, years, k):
+    """int64 [year - 1 x k x k]: countries going from condition a in year j to b in year j + 1."""
+    n, m = codes.shape
+    if m < 2:
+        return np.zeros((0, k, k), dtype=np.int64)
+    before, after = codes[:, :-1], codes[:, 1:]
+    valid = (before >= 0) & (after >= 0) & consecutive(years)
+    step = np.broadcast_to(np.arange(m - 1), before.shape)
+    cells = (step[valid].astype(np.int64) * k + before[valid]) * k + after[valid]
+    return np.bincount(cells, minlength=(m - 1) * k * k).reshape(m - 1, k, k)
+
+
+def counts_by_year(codes, k):
+    """int64 [year x k]: countries in each condition per year."""
+    n, m = codes.shape
+    valid = codes >= 0
+    step = np.broadcast_to(np.arange(m), codes.shape)
+    cells = step[valid].astype(np.int64) * k + codes[valid]
+    return np.bincount(cells, minlength=m * k).reshape(m, k)
+
+
+def compute_analytics(codes, years, k):
+    country, code, start, length = run_lengths(codes, years)
+    return {
+        "spell_country": country,
+        "spell_code": code,
+        "spell_start": start,
+        "spell_length": length,
+        "transitions": transitions_by_year(codes, years, k),
+        "counts": counts_by_year(codes, k),
+    }
+
+
+class ConditionAnalytics:
+    """Spells, transitions and counts of one panel; the DataFrames are built on request."""
+
+    def __init__(self, panel, conditions, arrays):
+        self.countries = panel.countries
+        self.names = panel.names
+        self.years = panel.years
+        self.conditions = conditions
+        self.arrays = arrays
+
+    def spells(self):
+        """One row per spell: ISO_Code, Country, Economic_Condition, Start_Year, End_Year, Years."""
+        a = self.arrays
+        start = self.years[a["spell_start"]]
+        return pd.DataFrame({
+            'ISO_Code': self.countries[a["spell_country"]],
+            'Country': self.names[a["spell_country"]],
+            CONDITION_COLUMN: pd.Categorical.from_codes(a["spell_code"], self.conditions),
+            'Start_Year': start,
+            'End_Year': start + a["spell_length"] - 1,
+            'Years': a["spell_length"],
+        })
+
+    def spell_summary(self):
+        """Spell count and duration statistics (in years) per condition."""
+        spells = self.spells()
+        summary = spells.groupby(CONDITION_COLUMN, observed=False)['Years'].agg(
+            ['count', 'mean', 'median', 'max'])
+        return summary.rename(columns={'count': 'Spells', 'mean': 'Mean_Years',
+                                       'median': 'Median_Years', 'max': 'Max_Years'})
+
+    def transition_matrix(self, start_year=None, end_year=None, normalize=False):
+        """
+        Condition (rows) -> next year's condition (columns) over transitions starting in
+        [start_year, end_year). normalize=True gives row probabilities.
+        """
+        steps = self.years[:-1]
+        mask = np.ones(len(steps), dtype=bool)
+        if start_year is not None:
+            mask &= steps >= start_year
+        if end_year is not None:
+            mask &= steps < end_year
+        matrix = self.arrays["transitions"][mask].sum(axis=0)
+        if normalize:
+            totals = matrix.sum(axis=1, keepdims=True)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                matrix = np.where(totals > 0, matrix / totals, np.nan)
+        return pd.DataFrame(matrix, index=pd.Index(self.conditions, name='From'),
+                            columns=pd.Index(self.conditions, name='To'))
+
+    def counts(self):
+        """Countries per condition (columns) per year (rows)."""
+        return pd.DataFrame(self.arrays["counts"], index=pd.Index(self.years, name='Year'),
+                            columns=self.conditions)
+
+    def dashboard_payload(self):
+        """JSON-ready summary for the dashboard's condition panel."""
+        probabilities = self.transition_matrix(normalize=True).to_numpy()
+        summary = self.spell_summary()
+        return {
+            "conditions": list(self.conditions),
+            "years": self.years.tolist(),
+            "counts": self.arrays["counts"].T.tolist(),
+            "transitions": np.where(np.isnan(probabilities), None, np.round(probabilities, 4)).tolist(),
+            "meanSpell": [None if pd.isna(value) else round(float(value), 2) for value in summary['Mean_Years']],
+        }
+
+
+def _cache_key(conditions, codes, years):
+    digest = hashlib.sha256(code_digest(compute_analytics, run_lengths, transitions_by_year,
+                                        counts_by_year, consecutive).encode())
+    digest.update("\n".join(conditions).encode("utf-8"))
+    digest.update(np.ascontiguousarray(years, dtype="<i8").tobytes())
+    digest.update(np.ascontiguousarray(codes, dtype="<i2").tobytes())
+    return digest.hexdigest()
+
+
+def condition_analytics(data, conditions=None, cache_dir=CACHE_DIR):
+    """
+    ConditionAnalytics for a merged DataFrame or a Panel with an Economic_Condition
+    label grid. cache_dir=None disables the on-disk cache.
+    """
+    panel = as_panel(data, [], [CONDITION_COLUMN])
+    conditions = condition_names() if conditions is None else list(conditions)
+    codes = panel.codes(CONDITION_COLUMN, conditions)
+    k = len(conditions)
+
+    key = _cache_key(conditions, codes, panel.years) if cache_dir else None
+    path = os.path.join(cache_dir, f"{key}.npz") if cache_dir else None
+    arrays = None
+    if path and os.path.exists(path):
+        try:
+            with np.load(path) as cached:
+                arrays = {name: cached[name] for name in cached.files}
+        except (OSError, ValueError):
+            arrays = None
+    if arrays is None:
+        arrays = compute_analytics(codes, panel.years, k)
+        if path:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Unique per process, so concurrent writers never share a temp file
+            tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp_path, **arrays)
+            os.replace(tmp_path, path)
+    return ConditionAnalytics(panel, conditions, arrays)
@@ -1,139 +1,254 @@
+import numpy as np
 import pandas as pd
 import os
+from pandas.api.types import union_categoricals
 
-GDP_PATH = "/home/ivanximik/.cache/kagglehub/datasets/holoong9291/gdp-of-all-countries19602020/versions/3/gdp_1960_2020.csv"
-INFLATION_PATH = "/home/ivanximik/.cache/kagglehub/datasets/sazidthe1/global-inflation-data/versions/1/global_inflation_data.csv"
+from classification import classify, real_growth
+from columnar_store import PARQUET_PATH, has_pyarrow, write_parquet
+from dataset_registry import fetch_all
+from instrumentation import instrumented, traced_run
+from iso_resolver import resolve_iso3
+from join_engine import join_chunked, join_frames
+
+# Raw inputs; None means "resolve through dataset_registry" (cache, datasets/, then Kaggle)
+GDP_PATH = None
+INFLATION_PATH = None
 OUTPUT_PATH = "datasets/economic_data_1980_2020.csv"
 
-def load_data():
+YEAR_START, YEAR_END = 1980, 2020
+INFLATION_INDICATOR = "Annual average inflation (consumer prices) rate"
+CHUNK_SIZE = 100_000
+# Position of each GDP row, carried through the out-of-core join to restore GDP order
+ROW_COLUMN = '_gdp_row'
+
+# Standardize country names for GDP dataset
+# Mappings based on inspection of mismatches with Inflation dataset
+GDP_COUNTRY_FIXES = {
+    'the United States': 'United States',
+    'Russia': 'Russian Federation',
+    'China': "China, People's Republic of",
+    'Turkey': "Türkiye, Republic of",
+    'South Korea': "Korea, Republic of",
+    'Congo (gold)': "Congo, Dem. Rep. of the",
+    'Garner': 'Ghana',
+    "C ô te d'Ivoire": "Côte d'Ivoire",
+    'Congo (Brazzaville)': "Congo, Republic of ",
+    'Central Africa': 'Central African Republic',
+    'Gambia': 'Gambia, The',
+    'Guinea Bissau': 'Guinea-Bissau',
+    'Cape Verde': 'Cabo Verde',
+    'Sao Tome and Principe.': 'São Tomé and Príncipe',
+    'South Sultan': 'South Sudan, Republic of',
+    'Columbia': 'Colombia',
+    'Hong Kong': 'Hong Kong SAR',
+    'Macao': 'Macao SAR'
+}
+
+# Names the GDP file uses for two countries: in a year where the name occurs twice,
+# the row with the larger GDP belongs to the mapped country
+GDP_SHARED_NAMES = {
+    'Dominica': 'Dominican Republic'
+}
+
+# Columns and compact dtypes used when streaming the long-format GDP file
+GDP_DTYPES = {'year': 'int16', 'country': 'category', 'state': 'category', 'gdp': 'float64'}
+# gdp is read as text and coerced per chunk, like prepare_gdp, so a bad cell becomes NaN instead of an error
+GDP_READ_DTYPES = {**GDP_DTYPES, 'gdp': 'str'}
+
+def input_paths(gdp_path=None, inflation_path=None):
+    """GDP and inflation file paths, fetching any dataset without an explicit path concurrently."""
+    paths = {"gdp": gdp_path or GDP_PATH, "inflation": inflation_path or INFLATION_PATH}
+    missing = [name for name, path in paths.items() if path is None]
+    if missing:
+        paths.update(fetch_all(missing))
+    return paths["gdp"], paths["inflation"]
+
+@instrumented("load_data")
+def load_data(streaming=False, chunksize=CHUNK_SIZE):
     print("Loading datasets...")
-    gdp_df = pd.read_csv(GDP_PATH)
-    inflation_df = pd.read_csv(INFLATION_PATH)
+    gdp_path, inflation_path = input_paths()
+    if streaming:
+        return load_gdp_streaming(gdp_path, chunksize), load_inflation_streaming(inflation_path, chunksize)
+    gdp_df = pd.read_csv(gdp_path)
+    inflation_df = pd.read_csv(inflation_path)
     return gdp_df, inflation_df
 
-def process_gdp(gdp_df):
-    print("Processing GDP data...")
-    # Filter years 1980-2020
-    gdp_df = gdp_df[(gdp_df['year'] >= 1980) & (gdp_df['year'] <= 2020)].copy()
+def standardize_gdp_countries(countries):
+    """Apply GDP_COUNTRY_FIXES, remapping categories instead of rows for categorical input."""
+    if not isinstance(countries.dtype, pd.CategoricalDtype):
+        return countries.replace(GDP_COUNTRY_FIXES)
+    fixed = [GDP_COUNTRY_FIXES.get(name, name) for name in countries.cat.categories]
+    # Two raw spellings may collapse into one name, so re-factorize the categories
+    inverse, categories = pd.factorize(pd.Index(fixed), sort=True)
+    codes = countries.cat.codes.to_numpy()
+    codes = np.where(codes >= 0, inverse[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=countries.index, name=countries.name)
+
+def iter_gdp_chunks(path, chunksize=CHUNK_SIZE):
+    """Yield year-filtered, name-standardized GDP chunks with categorical country/state."""
+    reader = pd.read_csv(path, usecols=list(GDP_DTYPES), dtype=GDP_READ_DTYPES, chunksize=chunksize)
+    for chunk in reader:
+        chunk = chunk[(chunk['year'] >= YEAR_START) & (chunk['year'] <= YEAR_END)]
+        if chunk.empty:
+            continue
+        yield chunk.assign(country=standardize_gdp_countries(chunk['country']),
+                           gdp=pd.to_numeric(chunk['gdp'], errors='coerce').astype('float64'))
+
+def load_gdp_streaming(path, chunksize=CHUNK_SIZE):
+    """
+    Read the GDP file chunk by chunk. Each filtered chunk is split into its compact
+    column arrays right away and the chunk frame is dropped; columns are then joined
+    one at a time, releasing their parts, so peak memory stays near the size of the
+    result plus one raw chunk.
+    """
+    parts = {name: [] for name in GDP_DTYPES}
+    for chunk in iter_gdp_chunks(path, chunksize):
+        for name in GDP_DTYPES:
+            parts[name].append(chunk[name].array if name in ('country', 'state') else chunk[name].to_numpy())
+        del chunk
+    if not parts['year']:
+        return pd.DataFrame({name: pd.Series(dtype=dtype) for name, dtype in GDP_DTYPES.items()})
+    columns = {}
+    for name in GDP_DTYPES:
+        pieces = parts.pop(name)
+        if name in ('country', 'state'):
+            columns[name] = union_categoricals(pieces, sort_categories=True)
+        else:
+            columns[name] = np.concatenate(pieces)
+        del pieces
+    return pd.DataFrame(columns)[list(GDP_DTYPES)]
+
+def load_inflation_streaming(path, chunksize=CHUNK_SIZE):
+    """Read only the identifier and target-year columns of the wide inflation file, chunk by chunk."""
+    wanted = {'country_name', 'indicator_name'} | {str(year) for year in range(YEAR_START, YEAR_END + 1)}
+    reader = pd.read_csv(path, usecols=lambda column: column in wanted, chunksize=chunksize)
+    return pd.concat(reader, ignore_index=True)
+
+def prepare_gdp(gdp_df, year_start=YEAR_START, year_end=YEAR_END):
+    """Year-filtered GDP rows with renamed columns, standardized names and numeric GDP."""
+    gdp_df = gdp_df[(gdp_df['year'] >= year_start) & (gdp_df['year'] <= year_end)].copy()
     
     # Rename columns for consistency
     gdp_df = gdp_df.rename(columns={'country': 'Country', 'year': 'Year', 'gdp': 'GDP'})
     
     # Standardize country names for GDP dataset
-    # Mappings based on inspection of mismatches with Inflation dataset
-    gdp_df['Country'] = gdp_df['Country'].replace({
-        'the United States': 'United States',
-        'Russia': 'Russian Federation',
-        'China': "China, People's Republic of",
-        'Turkey': "Türkiye, Republic of",
-        'South Korea': "Korea, Republic of",
-        'Congo (gold)': "Congo, Dem. Rep. of the",
-        'Garner': 'Ghana',
-        "C ô te d'Ivoire": "Côte d'Ivoire",
-        'Congo (Brazzaville)': "Congo, Republic of ",
-        'Central Africa': 'Central African Republic',
-        'Gambia': 'Gambia, The',
-        'Guinea Bissau': 'Guinea-Bissau',
-        'Cape Verde': 'Cabo Verde',
-        'Sao Tome and Principe.': 'São Tomé and Príncipe',
-        'South Sultan': 'South Sudan, Republic of'
-    })
+    gdp_df['Country'] = standardize_gdp_countries(gdp_df['Country'])
     
     # Ensure GDP is numeric
     gdp_df['GDP'] = pd.to_numeric(gdp_df['GDP'], errors='coerce')
+    return split_shared_names(gdp_df)
+
+def split_shared_names(gdp_df):
+    """Relabel the larger of two same-year rows of a GDP_SHARED_NAMES name as the other country."""
+    for name, other in GDP_SHARED_NAMES.items():
+        rows = gdp_df[(gdp_df['Country'] == name) & gdp_df['GDP'].notna()]
+        repeated = rows[rows.duplicated('Year', keep=False)]
+        if repeated.empty:
+            continue
+        larger = repeated.groupby('Year')['GDP'].idxmax().to_numpy()
+        countries = gdp_df['Country']
+        if isinstance(countries.dtype, pd.CategoricalDtype) and other not in countries.cat.categories:
+            # Keep the categories sorted: process_gdp sorts by Country, and categorical input
+            # (streaming) must come out in the same order as strings (in memory)
+            gdp_df['Country'] = countries.cat.set_categories(sorted([*countries.cat.categories, other]))
+        gdp_df.loc[larger, 'Country'] = other
+    return gdp_df
+
+@instrumented("process_gdp")
+def process_gdp(gdp_df, year_start=YEAR_START, year_end=YEAR_END):
+    print("Processing GDP data...")
+    gdp_df = prepare_gdp(gdp_df, year_start, year_end)
     
     # Calculate Nominal GDP Growth
     # Sort by Country and Year to ensure correct shift
     gdp_df = gdp_df.sort_values(by=['Country', 'Year'])
-    gdp_df['GDP_Growth'] = gdp_df.groupby('Country')['GDP'].pct_change() * 100
+    gdp_df['GDP_Growth'] = gdp_df.groupby('Country', observed=True)['GDP'].pct_change() * 100
     
     return gdp_df[['Country', 'Year', 'GDP', 'GDP_Growth', 'state']] # 'state' is continent
 
-def process_inflation(inflation_df):
-    print("Processing Inflation data...")
-    # Melt from wide to long
-    # Columns are country_name, indicator_name, 1980, 1981...
-    # We drop indicator_name
-    inflation_df = inflation_df.drop(columns=['indicator_name'])
-    
-    inflation_long = inflation_df.melt(id_vars=['country_name'], var_name='Year', value_name='Inflation')
-    
-    # Rename columns
-    inflation_long = inflation_long.rename(columns={'country_name': 'Country'})
-    
-    # Convert Year to integer
-    inflation_long['Year'] = pd.to_numeric(inflation_long['Year'], errors='coerce')
-    
-    # Filter years 1980-2020
-    inflation_long = inflation_long[(inflation_long['Year'] >= 1980) & (inflation_long['Year'] <= 2020)]
-    
-    # Ensure Inflation is numeric
-    inflation_long['Inflation'] = pd.to_numeric(inflation_long['Inflation'], errors='coerce')
-    
-    return inflation_long
-
-import pycountry
-
-def get_iso3(country_name):
-    """Map country names to ISO-3 codes with a manual dictionary for edge cases."""
-    manual_map = {
-        "Russia": "RUS",
-        "Russian Federation": "RUS",
-        "the United States": "USA",
-        "United States": "USA",
-        "China": "CHN",
-        "China, People's Republic of": "CHN",
-        "South Korea": "KOR",
-        "Korea, Republic of": "KOR",
-        "Turkey": "TUR",
-        "Türkiye, Republic of": "TUR",
-        "Vietnam": "VNM",
-        "Venezuela, Bolivarian Republic of": "VEN",
-        "Iran, Islamic Republic of": "IRN",
-        "Congo, Dem. Rep. of the": "COD",
-        "Congo (gold)": "COD",
-        "Congo, Republic of": "COG",
-        "Congo (Brazzaville)": "COG",
-        "Tanzania": "TZA",
-        "Egypt": "EGY",
-        "Syrian Arab Republic": "SYR",
-        "Lao P.D.R.": "LAO",
-        "Kyrgyz Republic": "KGZ",
-        "Slovak Republic": "SVK",
-        "Czech Republic": "CZE",
-        "Bahamas, The": "BHS",
-        "Gambia, The": "GMB",
-        "St. Lucia": "LCA",
-        "St. Vincent and the Grenadines": "VCT",
-        "St. Kitts and Nevis": "KNA",
-        "Bolivia": "BOL",
-        "Brunei Darussalam": "BRN",
-        "Trinidad and Tobago": "TTO",
-        "Micronesia, Fed. States of": "FSM",
-        "Cape Verde": "CPV",
-        "Cabo Verde": "CPV",
-        "Yemen, Republic of": "YEM"
-    }
-    
-    if country_name in manual_map:
-        return manual_map[country_name]
-    
+def year_columns(columns, year_start=YEAR_START, year_end=YEAR_END):
+    """{column label: int year} for the wide-file year columns inside the target range."""
+    years = {}
+    for column in columns:
+        label = str(column).strip()
+        if label.isdigit() and year_start <= int(label) <= year_end:
+            years[column] = int(label)
+    return years
+
+def reshape_wide(wide_df, id_column='country_name', indicator_column='indicator_name', value_name='value',
+                 year_start=YEAR_START, year_end=YEAR_END):
+    """
+    Wide (one column per year) to long [Country, indicator_name, Year, value], year-major.
+    Only the target year columns are touched: they are parsed straight to float64 and
+    Year is built as an int64 array from the column labels, never from strings per row.
+    Every indicator in the file is kept, keyed by indicator_name.
+    """
+    years = year_columns(wide_df.columns, year_start, year_end)
+    selected = wide_df[list(years)]
     try:
-        # Search by name
-        res = pycountry.countries.search_fuzzy(country_name)
-        if res:
-            return res[0].alpha_3
-    except:
-        pass
-    return None
-
-def merge_data(gdp_df, inflation_df):
+        values = selected.to_numpy(dtype='float64', na_value=np.nan)
+    except (TypeError, ValueError):
+        # Non-numeric markers such as '..' in some cells
+        values = selected.apply(pd.to_numeric, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+    n_rows, n_years = values.shape
+    columns = {'Country': np.tile(wide_df[id_column].to_numpy(), n_years)}
+    if indicator_column in wide_df.columns:
+        columns['indicator_name'] = np.tile(wide_df[indicator_column].to_numpy(), n_years)
+    columns['Year'] = np.repeat(np.fromiter(years.values(), dtype='int64', count=n_years), n_rows)
+    columns[value_name] = values.T.ravel()
+    return pd.DataFrame(columns)
+
+def indicators_to_columns(long_df, value_name='value'):
+    """Long multi-indicator frame to one row per (Country, Year) with a column per indicator."""
+    wide = long_df.pivot_table(index=['Country', 'Year'], columns='indicator_name', values=value_name,
+                               aggfunc='first', dropna=False, observed=True)
+    wide.columns.name = None
+    return wide.reset_index()
+
+@instrumented("process_inflation")
+def process_inflation(inflation_df, indicator=INFLATION_INDICATOR, year_start=YEAR_START, year_end=YEAR_END):
+    print("Processing Inflation data...")
+    # Keep one indicator when the file carries several; reshape only the target years
+    if indicator is not None and 'indicator_name' in inflation_df.columns:
+        inflation_df = inflation_df[inflation_df['indicator_name'] == indicator]
+    inflation_long = reshape_wide(inflation_df, value_name='Inflation', year_start=year_start, year_end=year_end)
+    return inflation_long[['Country', 'Year', 'Inflation']]
+
+def frame_chunks(df, chunksize=CHUNK_SIZE):
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+def join_out_of_core(gdp_df, inflation_df, chunksize=CHUNK_SIZE):
+    """
+    Inner join on (Country, Year) through join_chunked: both sources are spilled to disk
+    in hash partitions chunk by chunk and joined one partition at a time. The partitions
+    are put back in GDP row order, so the result equals the in-memory join_frames.
+    """
+    gdp_df = gdp_df.assign(**{ROW_COLUMN: np.arange(len(gdp_df))})
+    sources = [frame_chunks(gdp_df, chunksize), frame_chunks(inflation_df, chunksize)]
+    parts = list(join_chunked(sources, on=('Country', 'Year'), how='inner'))
+    if not parts:
+        merged_df = join_frames([gdp_df.iloc[:0], inflation_df.iloc[:0]], on=('Country', 'Year'), how='inner')
+        return merged_df.drop(columns=ROW_COLUMN)
+    merged_df = pd.concat(parts, ignore_index=True)
+    del parts
+    # Stable, so a GDP row matching several inflation rows keeps their order
+    merged_df = merged_df.sort_values(ROW_COLUMN, kind='stable', ignore_index=True)
+    return merged_df.drop(columns=ROW_COLUMN)
+
+@instrumented("merge_data")
+def merge_data(gdp_df, inflation_df, chunksize=None):
+    """Join, resolve ISO codes and classify; with chunksize (streaming mode), the join runs out of core."""
     print("Merging datasets...")
-    merged_df = pd.merge(gdp_df, inflation_df, on=['Country', 'Year'], how='inner')
+    if chunksize is None:
+        merged_df = join_frames([gdp_df, inflation_df], on=('Country', 'Year'), how='inner')
+    else:
+        merged_df = join_out_of_core(gdp_df, inflation_df, chunksize)
     
     # Add ISO Codes for mapping
     print("Mapping ISO-3 codes...")
-    merged_df['ISO_Code'] = merged_df['Country'].apply(get_iso3)
+    merged_df['ISO_Code'] = resolve_iso3(merged_df['Country'])
     
     # Log mapping failures for debugging
     failed_counts = merged_df[merged_df['ISO_Code'].isna()]['Country'].unique()
@@ -141,40 +256,42 @@ def merge_data(gdp_df, inflation_df):
         print(f"Warning: Failed to map {len(failed_counts)} countries: {failed_counts[:10]}...")
 
     # Calculate Real GDP Growth...
-    def calculate_real_growth(row):
-        nominal_growth = row['GDP_Growth']
-        inflation = row['Inflation']
-        if pd.isna(nominal_growth) or pd.isna(inflation): return None
-        return ((1 + nominal_growth/100) / (1 + inflation/100) - 1) * 100
-    
-    merged_df['Real_GDP_Growth'] = merged_df.apply(calculate_real_growth, axis=1)
+    merged_df['Real_GDP_Growth'] = real_growth(merged_df['GDP_Growth'], merged_df['Inflation'])
     
     # Determine Economic Condition...
-    def get_detailed_status(row):
-        inf, gdp = row['Inflation'], row['Real_GDP_Growth']
-        if pd.isna(inf) or pd.isna(gdp): return "Unknown"
-        if inf > 100: return "Hyperinflation"
-        if inf < 0: return "Deflation"
-        if inf > 5 and gdp < 1: return "Stagflation"
-        if inf > 5 and gdp > 5: return "Overheating"
-        if 0 <= inf <= 5 and gdp > 3: return "Healthy Growth"
-        if 0 <= inf <= 5 and 0 < gdp <= 3: return "Steady Growth"
-        if gdp <= 0: return "Recession"
-        return "Other"
-
-    merged_df['Economic_Condition'] = merged_df.apply(get_detailed_status, axis=1)
+    merged_df['Economic_Condition'] = classify(merged_df)
     return merged_df
 
-if __name__ == "__main__":
-    gdp, inflation = load_data()
-    gdp_clean = process_gdp(gdp)
-    inflation_clean = process_inflation(inflation)
-    
-    final_df = merge_data(gdp_clean, inflation_clean)
-    
+def finalize_data(final_df):
     # Filter only rows with ISO codes to avoid map artifacts
-    final_df = final_df[final_df['ISO_Code'].notna()]
-    
+    return final_df[final_df['ISO_Code'].notna()]
+
+def save_data(final_df, output_path=OUTPUT_PATH, parquet_path=PARQUET_PATH):
     print(f"Final data has {len(final_df)} rows and {len(final_df['Country'].unique())} countries.")
-    final_df.to_csv(OUTPUT_PATH, index=False)
-    print(f"Saved to {OUTPUT_PATH}")
+    final_df.to_csv(output_path, index=False)
+    print(f"Saved to {output_path}")
+    if parquet_path and has_pyarrow():
+        write_parquet(final_df, parquet_path)
+        print(f"Saved to {parquet_path}")
+
+if __name__ == "__main__":
+    from incremental import appended_years
+    appended = appended_years()
+    if appended:
+        print(f"Warning: dropping appended years {appended}; append them again after this run")
+
+    with traced_run("data_processor"):
+        gdp, inflation = load_data()
+        gdp_clean = process_gdp(gdp)
+        inflation_clean = process_inflation(inflation)
+
+        # Screen the inputs before merging; problems are reported, not fatal (see cli.py process --fail-fast)
+        from validation import validate_inputs
+        print(validate_inputs(gdp_clean, inflation_clean, gdp_raw=gdp, inflation_raw=inflation).summary())
+
+        final_df = finalize_data(merge_data(gdp_clean, inflation_clean))
+        save_data(final_df)
+
+        # Last GDP row per country, so later years can be appended without this full run
+        from incremental import build_state, save_state
+        save_state(build_state(gdp_clean))
@@ -0,0 +1,185 @@
+"""
+Registry of the raw input datasets with an offline-first, content-addressed cache.
+
+    from dataset_registry import fetch, fetch_all
+    gdp_path = fetch("gdp")                      # cached path, verified against its checksum
+    paths = fetch_all(["gdp", "inflation"])      # fetched concurrently
+
+Each dataset is stored once under .cache/datasets/<sha256>/<filename> and an index
+maps its name to the digest it resolved to. Sources are tried only when the cache
+cannot serve a dataset (or refresh=True). The default order is the bundled datasets/ directory, then
+Kaggle through kagglehub. Any object with a `fetch(spec)` method that returns a file
+path can be used as a source.
+"""
+import asyncio
+import json
+import os
+import shutil
+import threading
+
+from pipeline import file_digest
+
+CACHE_DIR = ".cache/datasets"
+LOCAL_DIR = "datasets"
+
+
+class IntegrityError(ValueError):
+    """A fetched or cached file does not match the registered checksum."""
+
+
+class DatasetSpec:
+    def __init__(self, name, kaggle_handle, filename, sha256=None):
+        self.name = name
+        self.kaggle_handle = kaggle_handle
+        self.filename = filename
+        self.sha256 = sha256  # None: accept whatever the first fetch returns
+
+
+# Checksums pin the bundled copies in datasets/ (Kaggle versions 3 and 1)
+DATASETS = {
+    "gdp": DatasetSpec(
+        "gdp", "holoong9291/gdp-of-all-countries19602020/versions/3", "gdp_1960_2020.csv",
+        "dac45c9b7968d45498fbe9213bb9869ebb58165a40e1984727c79e3bb5d9494b",
+    ),
+    "inflation": DatasetSpec(
+        "inflation", "sazidthe1/global-inflation-data/versions/1", "global_inflation_data.csv",
+        "77037450749d3f3d0132423ec663aa62bcc6671ea75588bc3ac56c0e1faad9b0",
+    ),
+}
+
+
+class LocalDirSource:
+    """Datasets already on disk, e.g. the bundled datasets/ directory or a build-machine mirror."""
+
+    def __init__(self, directory=LOCAL_DIR):
+        self.directory = directory
+
+    def fetch(self, spec):
+        path = os.path.join(self.directory, spec.filename)
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        return path
+
+    def __repr__(self):
+        return f"LocalDirSource({self.directory!r})"
+
+
+class KaggleSource:
+    """Download through kagglehub (imported only when a download is actually needed)."""
+
+    def fetch(self, spec):
+        import kagglehub
+
+        directory = kagglehub.dataset_download(spec.kaggle_handle)
+        path = os.path.join(directory, spec.filename)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{spec.filename} not found in {directory}")
+        return path
+
+    def __repr__(self):
+        return "KaggleSource()"
+
+
+def default_sources():
+    return [LocalDirSource(LOCAL_DIR), KaggleSource()]
+
+
+_index_lock = threading.Lock()
+
+
+def _index_path(cache_dir):
+    return os.path.join(cache_dir, "index.json")
+
+
+def load_index(cache_dir=CACHE_DIR):
+    try:
+        with open(_index_path(cache_dir), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _record(cache_dir, name, digest):
+    with _index_lock:
+        index = load_index(cache_dir)
+        index[name] = digest
+        tmp_path = _index_path(cache_dir) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, _index_path(cache_dir))
+
+
+def _blob_path(cache_dir, digest, spec):
+    return os.path.join(cache_dir, digest, spec.filename)
+
+
+def cached_path(name, cache_dir=CACHE_DIR, verify=True):
+    """Path of the cached copy of `name`, or None if it is missing or fails verification."""
+    spec = DATASETS[name]
+    digest = load_index(cache_dir).get(name)
+    if digest is None or (spec.sha256 and digest != spec.sha256):
+        return None
+    path = _blob_path(cache_dir, digest, spec)
+    if not os.path.exists(path):
+        return None
+    if verify and file_digest(path) != digest:
+        return None
+    return path
+
+
+def fetch(name, sources=None, cache_dir=CACHE_DIR, verify=True, refresh=False):
+    """
+    Local path of dataset `name`. The cache is used when it holds a copy with the
+    expected digest (unless refresh=True); otherwise sources are tried in order and
+    the first good copy is stored in the cache. A source whose file fails the checksum
+    is skipped like an unavailable one. If no source succeeds, raises IntegrityError
+    when any of them returned a mismatching file, FileNotFoundError otherwise.
+    """
+    spec = DATASETS[name]
+    path = None if refresh else cached_path(name, cache_dir, verify)
+    if path:
+        return path
+
+    errors = []
+    mismatched = False
+    for source in sources if sources is not None else default_sources():
+        try:
+            fetched = source.fetch(spec)
+        except Exception as e:  # a missing mirror or no network just moves on to the next source
+            errors.append(f"{source!r}: {e}")
+            continue
+        digest = file_digest(fetched)
+        if spec.sha256 and digest != spec.sha256:
+            errors.append(f"{source!r}: sha256 {digest}, expected {spec.sha256}")
+            mismatched = True
+            continue
+        path = _blob_path(cache_dir, digest, spec)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            shutil.copyfile(fetched, tmp_path)
+            os.replace(tmp_path, path)
+        _record(cache_dir, name, digest)
+        print(f"Fetched {name} from {source!r} ({digest[:12]})")
+        return path
+    error = IntegrityError if mismatched else FileNotFoundError
+    raise error(f"Dataset {name!r} is not available: " + "; ".join(errors))
+
+
+async def fetch_async(names, sources=None, cache_dir=CACHE_DIR, verify=True, refresh=False):
+    """Fetch several datasets concurrently; returns {name: path}."""
+    paths = await asyncio.gather(*[
+        asyncio.to_thread(fetch, name, sources, cache_dir, verify, refresh) for name in names
+    ])
+    return dict(zip(names, paths))
+
+
+def fetch_all(names=None, sources=None, cache_dir=CACHE_DIR, verify=True, refresh=False):
+    """Blocking wrapper around fetch_async for every (or the given) registered dataset."""
+    names = list(DATASETS) if names is None else list(names)
+    return asyncio.run(fetch_async(names, sources, cache_dir, verify, refresh))
+
+
+def dataset_digest(name, cache_dir=CACHE_DIR):
+    """Digest the cache index holds for `name` (the content hash of the last fetch)."""
+    return load_index(cache_dir).get(name)
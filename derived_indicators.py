@@ -0,0 +1,138 @@
+"""
+Derived indicators computed on the [country x year] panel.
+
+Every indicator is a vectorized window or cross-section over the panel grids
+(rolling windows run along the year axis, ranks across countries within a year),
+so adding a metric costs one array expression rather than another groupby pass
+over merge_data output. Results are cached on disk keyed by a hash of the input
+grids and of this module's code.
+"""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from pipeline import code_digest
+
+CACHE_DIR = ".cache/derived"
+WINDOW = 5
+MIN_PERIODS = 3
+
+# Derived column -> map layer settings, merged into figure_builder.INDICATORS
+DERIVED_INDICATORS = {
+    "Real_GDP_Growth_5y": {"label": "GDP Growth (5y avg)", "colorscale": "RdYlGn", "range": [-10, 10]},
+    "Inflation_Volatility": {"label": "Inflation Volatility", "colorscale": "Reds", "range": [0, 15]},
+    "Real_GDP_Growth_Rank": {"label": "Growth Rank", "colorscale": "RdYlGn_r", "range": None},
+    "Real_GDP_Growth_Percentile": {"label": "Growth Percentile", "colorscale": "RdYlGn", "range": [0, 100]},
+    "Real_GDP_Index": {"label": "Real GDP Index", "colorscale": "RdYlGn", "range": [0, 200]},
+}
+
+SOURCE_COLUMNS = ['Real_GDP_Growth', 'Inflation']
+
+
+def _rolling(grid, window=WINDOW, min_periods=MIN_PERIODS):
+    """
+    Trailing-window sums along the year axis: (count, sum, sum of squares). NaN and
+    +-inf count as missing; they would otherwise poison every later window of the cumsum.
+    """
+    valid = np.isfinite(grid)
+    filled = np.where(valid, grid, 0.0)
+    # Window ending at year t covers cumulative positions (start[t], t + 1]
+    start = np.maximum(np.arange(1, grid.shape[1] + 1) - window, 0)
+
+    def window_sum(values):
+        cumulative = np.concatenate([np.zeros((grid.shape[0], 1)), np.cumsum(values, axis=1)], axis=1)
+        return cumulative[:, 1:] - cumulative[:, start]
+
+    count = window_sum(valid.astype(float))
+    total = window_sum(filled)
+    squares = window_sum(filled ** 2)
+    enough = count >= min_periods
+    return count, total, squares, enough
+
+
+def rolling_mean(grid, window=WINDOW, min_periods=MIN_PERIODS):
+    count, total, _, enough = _rolling(grid, window, min_periods)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(enough, total / count, np.nan)
+
+
+def rolling_std(grid, window=WINDOW, min_periods=MIN_PERIODS):
+    """Sample standard deviation (ddof=1) over a trailing window."""
+    count, total, squares, enough = _rolling(grid, window, max(min_periods, 2))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = (squares - total ** 2 / count) / (count - 1)
+    return np.where(enough, np.sqrt(np.clip(variance, 0, None)), np.nan)
+
+
+def year_rank(grid):
+    """Rank within each year across countries, 1 = highest; NaN where no value."""
+    return pd.DataFrame(grid).rank(axis=0, ascending=False, method="min").to_numpy()
+
+
+def year_percentile(grid):
+    """Percentile (0-100] within each year across countries, higher value = higher percentile."""
+    return pd.DataFrame(grid).rank(axis=0, pct=True).to_numpy() * 100
+
+
+def cumulative_index(growth, base=100.0):
+    """
+    Index of real GDP from percent growth, `base` in each country's first year with data.
+    Missing (or non-finite) years carry the index forward unchanged; years before the
+    first value stay NaN.
+    """
+    valid = np.isfinite(growth)
+    factors = np.where(valid, 1 + growth / 100, 1.0)
+    started = np.maximum.accumulate(valid, axis=1)
+    # The first year with data is the base year, so its own growth is not applied
+    first = started & ~np.concatenate([np.zeros((growth.shape[0], 1), dtype=bool), started[:, :-1]], axis=1)
+    factors = np.where(first | ~started, 1.0, factors)
+    return np.where(started, base * np.cumprod(factors, axis=1), np.nan)
+
+
+def compute_derived(growth, inflation):
+    return {
+        "Real_GDP_Growth_5y": rolling_mean(growth),
+        "Inflation_Volatility": rolling_std(inflation),
+        "Real_GDP_Growth_Rank": year_rank(growth),
+        "Real_GDP_Growth_Percentile": year_percentile(growth),
+        "Real_GDP_Index": cumulative_index(growth),
+    }
+
+
+def _cache_key(panel):
+    digest = hashlib.sha256(code_digest(compute_derived, _rolling, rolling_mean, rolling_std,
+                                        year_rank, year_percentile, cumulative_index).encode())
+    digest.update(f"{WINDOW}/{MIN_PERIODS}".encode())
+    digest.update("\n".join(panel.countries.tolist()).encode("utf-8"))
+    digest.update(np.ascontiguousarray(panel.years, dtype="<i8").tobytes())
+    for column in SOURCE_COLUMNS:
+        digest.update(np.ascontiguousarray(panel.values[column], dtype="<f8").tobytes())
+    return digest.hexdigest()
+
+
+def add_derived_indicators(panel, cache_dir=CACHE_DIR):
+    """
+    Add every DERIVED_INDICATORS grid to panel.values (in place) and return the panel.
+    cache_dir=None disables the on-disk cache.
+    """
+    key = _cache_key(panel) if cache_dir else None
+    path = os.path.join(cache_dir, f"{key}.npz") if cache_dir else None
+    derived = None
+    if path and os.path.exists(path):
+        try:
+            with np.load(path) as cached:
+                derived = {name: cached[name] for name in DERIVED_INDICATORS}
+        except (OSError, KeyError, ValueError):
+            derived = None
+    if derived is None:
+        derived = compute_derived(panel.values['Real_GDP_Growth'], panel.values['Inflation'])
+        if path:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Per-process name: batch_generator workers may compute the same key at once
+            tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp_path, **derived)
+            os.replace(tmp_path, path)
+    panel.values.update(derived)
+    return panel
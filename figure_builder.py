@@ -0,0 +1,124 @@
+import numpy as np
+import plotly.graph_objects as go
+
+from derived_indicators import DERIVED_INDICATORS
+from panel_store import as_panel, nullable
+
+DEFAULT_INDICATOR = "Real_GDP_Growth"
+
+# Continuous map layers: button label, colorscale and color range
+INDICATORS = {
+    "Real_GDP_Growth": {"label": "GDP Growth", "colorscale": "RdYlGn", "range": [-10, 10]},
+    "GDP_Growth": {"label": "Nominal GDP Growth", "colorscale": "RdYlGn", "range": [-10, 10]},
+    "Inflation": {"label": "Inflation", "colorscale": "RdYlGn_r", "range": [0, 20]},
+    **DERIVED_INDICATORS,
+}
+
+VALUE_HOVER = ("ISO_Code=%{{location}}<br>Country=%{{text}}<br>GDP=%{{customdata[0]:,.0f}}"
+               "<br>Inflation=%{{customdata[1]:.2f}}<br>{indicator}=%{{z:.2f}}<extra></extra>")
+CONDITION_HOVER = "Economic_Condition=%{customdata}<br>ISO_Code=%{location}<br>Country=%{text}<extra></extra>"
+
+
+def discrete_colorscale(colors):
+    """Step colorscale mapping integer code i to colors[i] for z in [-0.5, n - 0.5]."""
+    n = len(colors)
+    scale = []
+    for i, color in enumerate(colors):
+        scale.append([i / n, color])
+        scale.append([(i + 1) / n, color])
+    return scale
+
+
+def animation_controls(years, method="animate"):
+    """
+    Play/pause buttons and a year slider equivalent to the ones plotly.express generates.
+    method="skip" makes them inert so the page script can drive playback from the
+    plotly_sliderchange / plotly_buttonclicked events.
+    """
+    def animate_args(frame_names, duration):
+        return [frame_names, {
+            "frame": {"duration": duration, "redraw": True},
+            "mode": "immediate",
+            "fromcurrent": True,
+            "transition": {"duration": duration, "easing": "linear"}
+        }]
+
+    updatemenus = [{
+        "buttons": [
+            {"args": animate_args(None, 500), "label": "&#9654;", "method": method, "name": "play"},
+            {"args": animate_args([None], 0), "label": "&#9724;", "method": method, "name": "pause"}
+        ],
+        "direction": "left", "pad": {"r": 10, "t": 70}, "showactive": False, "type": "buttons",
+        "x": 0.1, "xanchor": "right", "y": 0, "yanchor": "top"
+    }]
+    sliders = [{
+        "active": 0,
+        "currentvalue": {"prefix": "Year="},
+        "len": 0.9, "pad": {"b": 10, "t": 60},
+        "steps": [
+            {"args": animate_args([str(year)], 0), "label": str(year), "method": method}
+            for year in years
+        ],
+        "x": 0.1, "xanchor": "left", "y": 0, "yanchor": "top"
+    }]
+    return updatemenus, sliders
+
+
+def base_layout(years, indicator=DEFAULT_INDICATOR, method="animate"):
+    updatemenus, sliders = animation_controls(years, method)
+    settings = INDICATORS[indicator]
+    cmin, cmax = settings["range"] or (None, None)  # None: scale to the data
+    return go.Layout(
+        coloraxis=dict(colorscale=settings["colorscale"], cmin=cmin, cmax=cmax,
+                       colorbar=dict(title=dict(text=indicator))),
+        updatemenus=updatemenus, sliders=sliders
+    )
+
+
+def value_trace(locations, names, values, gdp, inflation, indicator=DEFAULT_INDICATOR):
+    return go.Choropleth(
+        locations=locations, locationmode="ISO-3", text=names,
+        z=nullable(values), customdata=np.column_stack([gdp, inflation]),
+        coloraxis="coloraxis", hovertemplate=VALUE_HOVER.format(indicator=indicator), showlegend=False
+    )
+
+
+def condition_trace(locations, names, codes, conditions, color_map):
+    """One trace for every condition: integer codes over a discrete colorscale (code -1 = no data)."""
+    labels = np.array(list(conditions) + [None], dtype=object)
+    return go.Choropleth(
+        locations=locations, locationmode="ISO-3", text=names,
+        z=np.where(codes >= 0, codes, None), customdata=labels[codes],
+        colorscale=discrete_colorscale([color_map[name] for name in conditions]),
+        zmin=-0.5, zmax=len(conditions) - 0.5, showscale=False,
+        hovertemplate=CONDITION_HOVER, showlegend=False
+    )
+
+
+def build_figure(data, color_map, indicator=DEFAULT_INDICATOR):
+    """
+    Animated map with exactly two traces per frame (indicator, condition). Each frame is one
+    year column of the [country x year] panel. `data` is a merged DataFrame or a Panel.
+    Returns (figure, n_gdp, n_cond).
+    """
+    panel = as_panel(data, list(dict.fromkeys([indicator, 'GDP', 'Inflation'])), ['Economic_Condition'])
+    conditions = list(color_map.keys())
+    locations = panel.countries.astype(object)
+    names = panel.names
+    codes = panel.codes('Economic_Condition', conditions).astype(int)
+
+    frames = []
+    for j, year in enumerate(panel.years.tolist()):
+        rows = panel.present[:, j]
+        frames.append(go.Frame(
+            data=[
+                value_trace(locations[rows], names[rows], panel.values[indicator][rows, j],
+                            panel.values['GDP'][rows, j], panel.values['Inflation'][rows, j], indicator),
+                condition_trace(locations[rows], names[rows], codes[rows, j], conditions, color_map)
+            ],
+            name=str(year)
+        ))
+
+    fig = go.Figure(data=frames[0].data if frames else [], layout=base_layout(panel.years.tolist(), indicator),
+                    frames=frames)
+    return fig, 1, 1
@@ -0,0 +1,77 @@
+import base64
+
+import numpy as np
+import plotly.graph_objects as go
+
+from figure_builder import DEFAULT_INDICATOR, base_layout, condition_trace, value_trace
+from panel_store import as_panel
+
+MISSING_CODE = 255  # uint8 condition code for "country has no row this year"
+FRAME_ARRAYS = ["value", "gdp", "inflation", "condition"]  # the [year x location] grids of frame_grids()
+
+
+def _b64(array, dtype):
+    """Little-endian typed-array bytes as base64, decoded in the page with atob + TypedArray."""
+    return base64.b64encode(np.ascontiguousarray(array, dtype=dtype).tobytes()).decode("ascii")
+
+
+def frame_grids(data, conditions, indicator=DEFAULT_INDICATOR):
+    """
+    Lay the animation out as one shared locations list plus dense [year x location]
+    arrays; NaN / MISSING_CODE mark countries without a row that year.
+    `data` is a merged DataFrame or a Panel built from one.
+    """
+    panel = as_panel(data, list(dict.fromkeys([indicator, 'GDP', 'Inflation'])), ['Economic_Condition'])
+    codes = panel.codes('Economic_Condition', conditions)
+    codes[codes < 0] = MISSING_CODE
+
+    return {
+        "locations": panel.countries.tolist(),
+        "names": panel.names.tolist(),
+        "years": panel.years.tolist(),
+        "conditions": list(conditions),
+        "indicator": indicator,
+        # Transposed views of the [country x year] panel grids
+        "value": panel.values[indicator].T,
+        "gdp": panel.values['GDP'].T,
+        "inflation": panel.values['Inflation'].T,
+        "condition": codes.astype(np.uint8).T,
+    }
+
+
+def encode_frames(grids):
+    """JSON payload with float32 indicator/inflation, float64 GDP and uint8 condition codes as base64."""
+    return {
+        "locations": grids["locations"],
+        "names": grids["names"],
+        "years": grids["years"],
+        "conditions": grids["conditions"],
+        "value": _b64(grids["value"], "<f4"),
+        "gdp": _b64(grids["gdp"], "<f8"),
+        "inflation": _b64(grids["inflation"], "<f4"),
+        "condition": _b64(grids["condition"], np.uint8),
+    }
+
+
+def encode_year(grids, year):
+    """encode_frames payload of one year, for pages that load frames as they are shown; None if no such year."""
+    if year not in grids["years"]:
+        return None
+    i = grids["years"].index(year)
+    return encode_frames({**grids, "years": [year], **{name: grids[name][i:i + 1] for name in FRAME_ARRAYS}})
+
+
+def build_encoded_figure(grids, color_map, method="animate"):
+    """
+    Figure with a single indicator trace and a single condition trace showing the first year.
+    The remaining years are rebuilt in the browser from the encoded payload and added as frames,
+    or, with method="skip", restyled in by the page script one year at a time.
+    """
+    codes = grids["condition"][0].astype(int)
+    codes[codes == MISSING_CODE] = -1
+    traces = [
+        value_trace(grids["locations"], grids["names"], grids["value"][0], grids["gdp"][0], grids["inflation"][0],
+                    grids["indicator"]),
+        condition_trace(grids["locations"], grids["names"], codes, grids["conditions"], color_map)
+    ]
+    return go.Figure(data=traces, layout=base_layout(grids["years"], grids["indicator"], method=method))
@@ -0,0 +1,79 @@
+import json
+import os
+import re
+
+import numpy as np
+
+from panel_store import as_panel, nullable
+
+HISTORY_COLUMNS = ['Real_GDP_Growth', 'Inflation']
+# Names of the files write_history_files creates; nothing else in the directory is touched
+HISTORY_FILE_PATTERN = re.compile(r"[A-Z]{3}\.json")
+
+
+def _history_panel(data):
+    return as_panel(data, HISTORY_COLUMNS, [])
+
+
+def build_country_history(data):
+    """
+    Per-country chart payload {iso: {name, years, gdp, inflation}}: each country is one
+    row of the [country x year] panel, restricted to the years it has data for.
+    `data` is a merged DataFrame or a Panel built from one.
+    """
+    panel = _history_panel(data)
+    gdp = panel.values['Real_GDP_Growth']
+    inflation = panel.values['Inflation']
+
+    country_data = {}
+    for i, iso in enumerate(panel.countries.tolist()):
+        present = panel.present[i]
+        country_data[iso] = {
+            "name": panel.names[i],
+            "years": panel.years[present].tolist(),
+            "gdp": gdp[i, present].tolist(),
+            "inflation": inflation[i, present].tolist()
+        }
+    return country_data
+
+
+def build_compact_history(data):
+    """
+    Compact payload: one shared years axis plus per-country value arrays aligned to it,
+    with null for years a country has no data.
+    {"years": [...], "countries": {iso: {name, gdp, inflation}}}
+    """
+    panel = _history_panel(data)
+    countries = {}
+    for i, iso in enumerate(panel.countries.tolist()):
+        countries[iso] = {
+            "name": panel.names[i],
+            "gdp": nullable(panel.values['Real_GDP_Growth'][i]).tolist(),
+            "inflation": nullable(panel.values['Inflation'][i]).tolist()
+        }
+    return {"years": panel.years.tolist(), "countries": countries}
+
+
+def history_record(entry):
+    """One country's history with NaN replaced by None, safe for strict JSON."""
+    return {
+        "name": entry["name"],
+        "years": entry["years"],
+        "gdp": nullable(np.asarray(entry["gdp"], dtype="float64")).tolist(),
+        "inflation": nullable(np.asarray(entry["inflation"], dtype="float64")).tolist()
+    }
+
+
+def write_history_files(country_data, directory):
+    """
+    Write one <ISO>.json per country (strict JSON: NaN becomes null) and drop stale
+    <ISO>.json files of countries no longer in the data. Other files in `directory`
+    are left alone.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if HISTORY_FILE_PATTERN.fullmatch(name) and name[:-5] not in country_data:
+            os.remove(os.path.join(directory, name))
+    for iso, entry in country_data.items():
+        with open(os.path.join(directory, f"{iso}.json"), "w", encoding="utf-8") as f:
+            json.dump(history_record(entry), f, allow_nan=False)
@@ -0,0 +1,229 @@
+"""
+Streaming HTML output for the dashboard page.
+
+The page template is rendered piece by piece into a binary sink (a file, a socket's
+wfile or a BytesIO) instead of being assembled as one string. Large values go in
+slots (`slot("name")` in the template). A slot's writer serializes its value one
+trace, frame or country at a time, so the largest string held in memory is one such
+item rather than the whole document:
+
+    with open_output("map.html", compress="gzip") as out:
+        render(out, template, {"map": lambda o: write_figure(o, fig, "main-map")})
+
+JSON is encoded with orjson (with NumPy support) when it is installed, otherwise with
+the standard json module. `compress` also writes a precompressed sidecar next to the
+page (map.html.gz or, with the optional brotli package, map.html.br).
+"""
+import contextlib
+import gzip
+import json
+import os
+import re
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SLOT_PATTERN = re.compile(r"__SLOT_(\w+)__")
+SIDECAR_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+# Streamed containers are split down to this depth (figure -> trace, frames -> frame)
+JSON_SPLIT_DEPTH = 2
+
+# Same escapes plotly applies, so strings inside <script> cannot close the tag
+_SCRIPT_SAFE = (
+    (b"<", b"\\u003c"),
+    (b">", b"\\u003e"),
+    (b"/", b"\\u002f"),
+    ("\u2028".encode(), b"\\u2028"),
+    ("\u2029".encode(), b"\\u2029"),
+)
+
+
+def slot(name):
+    """Placeholder for a streamed value inside a page template."""
+    return f"__SLOT_{name}__"
+
+
+class HtmlStream:
+    """Writes text to a binary sink and, optionally, to a compressor for a sidecar file."""
+
+    def __init__(self, sink, compressed=None):
+        self.sink = sink
+        self.compressed = compressed
+        self.bytes_written = 0
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.sink.write(data)
+        if self.compressed is not None:
+            self.compressed.write(data)
+        self.bytes_written += len(data)
+
+    def write_json(self, value, depth=JSON_SPLIT_DEPTH):
+        for piece in iter_json(value, depth):
+            self.write(piece)
+
+
+class _BrotliWriter:
+    def __init__(self, f):
+        import brotli
+
+        self.f = f
+        self.compressor = brotli.Compressor()
+
+    def write(self, data):
+        self.f.write(self.compressor.process(data))
+
+    def close(self):
+        self.f.write(self.compressor.finish())
+
+
+def _compressed_writer(f, compress):
+    if compress == "gzip":
+        return gzip.GzipFile(fileobj=f, mode="wb", mtime=0)
+    return _BrotliWriter(f)
+
+
+@contextlib.contextmanager
+def open_output(path, compress=None):
+    """
+    HtmlStream onto `path` (plus `path`.gz / .br when compress is "gzip" / "br").
+    Files are written to a temporary name and moved into place only on success.
+    """
+    if compress is not None and compress not in SIDECAR_SUFFIXES:
+        raise ValueError(f"Unsupported compression {compress!r}")
+    if compress == "br":
+        import brotli  # noqa: F401  (fail before anything is written)
+    targets = [path] + ([path + SIDECAR_SUFFIXES[compress]] if compress else [])
+    try:
+        with contextlib.ExitStack() as files:
+            handles = [files.enter_context(open(target + ".tmp", "wb")) for target in targets]
+            compressed = _compressed_writer(handles[1], compress) if compress else None
+            yield HtmlStream(handles[0], compressed)
+            if compressed is not None:
+                compressed.close()
+    except BaseException:
+        for target in targets:
+            if os.path.exists(target + ".tmp"):
+                os.remove(target + ".tmp")
+        raise
+    for target in targets:
+        os.replace(target + ".tmp", target)
+
+
+def render(out, template, slots):
+    """Write `template` to `out`, calling slots[name](out) at every slot(name) marker."""
+    position = 0
+    for match in SLOT_PATTERN.finditer(template):
+        out.write(template[position:match.start()])
+        slots[match.group(1)](out)
+        position = match.end()
+    out.write(template[position:])
+
+
+# --- JSON -------------------------------------------------------------------
+
+def _default(value):
+    """NumPy values the encoders do not handle natively; NaN becomes null."""
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == "f":
+            items = value.astype(object)
+            items[np.isnan(value)] = None
+            return items.tolist()
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return None if value.dtype.kind == "f" and np.isnan(value) else value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def encode_json(value):
+        return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+else:
+    def encode_json(value):
+        return json.dumps(value, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def _script_safe(data):
+    for unsafe, safe in _SCRIPT_SAFE:
+        if unsafe in data:
+            data = data.replace(unsafe, safe)
+    return data
+
+
+def iter_json(value, depth=JSON_SPLIT_DEPTH):
+    """Script-safe JSON of `value` in pieces: dicts and lists are split `depth` levels deep."""
+    if depth > 0 and isinstance(value, dict):
+        yield b"{"
+        for i, (key, item) in enumerate(value.items()):
+            yield (b"," if i else b"") + _script_safe(encode_json(str(key))) + b":"
+            yield from iter_json(item, depth - 1)
+        yield b"}"
+    elif depth > 0 and isinstance(value, (list, tuple)):
+        yield b"["
+        for i, item in enumerate(value):
+            if i:
+                yield b","
+            yield from iter_json(item, depth - 1)
+        yield b"]"
+    else:
+        yield _script_safe(encode_json(value))
+
+
+# --- plotly figure ------------------------------------------------------------
+
+_plotlyjs_loader = None
+
+
+def plotlyjs_loader():
+    """The <script> tags plotly's to_html(include_plotlyjs='cdn') emits to load plotly.js."""
+    global _plotlyjs_loader
+    if _plotlyjs_loader is None:
+        import plotly.graph_objects as go
+
+        # Rendering an empty figure is cheap and keeps the CDN URL and SRI hash plotly's own
+        html = go.Figure().to_html(include_plotlyjs="cdn", full_html=False, div_id="plotlyjs-loader")
+        _plotlyjs_loader = html[html.index("<script"):html.index('<div id="plotlyjs-loader"')].strip()
+    return _plotlyjs_loader
+
+
+def _css_size(value, default):
+    if value is None:
+        return default
+    return f"{value}px" if isinstance(value, (int, float)) else str(value)
+
+
+def write_figure(out, fig, div_id, config=None, auto_play=True):
+    """
+    Stream the same div + Plotly.newPlot script as fig.to_html(include_plotlyjs='cdn',
+    full_html=False, div_id=div_id), serializing traces and frames one at a time.
+    `fig` is a plotly Figure or its to_dict().
+    """
+    fig_dict = fig if isinstance(fig, dict) else fig.to_dict()
+    layout = fig_dict.get("layout", {})
+    template_layout = layout.get("template", {}).get("layout", {})
+    width = _css_size(layout.get("width", template_layout.get("width")), "100%")
+    height = _css_size(layout.get("height", template_layout.get("height")), "100%")
+    config = dict(config or {})
+    config.setdefault("responsive", True)
+    frames = fig_dict.get("frames")
+
+    out.write(f'<div style="height:{height}; width:{width};">{plotlyjs_loader()}'
+              f'<div id="{div_id}" class="plotly-graph-div" style="height:100%; width:100%;"></div>'
+              f'<script>window.PLOTLYENV=window.PLOTLYENV || {{}};'
+              f'if (document.getElementById("{div_id}")) {{Plotly.newPlot("{div_id}", ')
+    out.write_json(fig_dict.get("data", []), depth=1)
+    out.write(", ")
+    out.write_json(layout, depth=1)
+    out.write(f", {json.dumps(config)})")
+    if frames:
+        out.write(f".then(function(){{Plotly.addFrames('{div_id}', ")
+        out.write_json(frames, depth=1)
+        out.write(");})")
+        if auto_play:
+            out.write(f".then(function(){{Plotly.animate('{div_id}', null);}})")
+    out.write("};</script></div>")
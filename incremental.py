@@ -0,0 +1,135 @@
+"""
+Append new years to the processed dataset without reprocessing its history.
+
+GDP_Growth is a per-country pct_change over consecutive GDP rows, so a new year only
+needs each country's last GDP row. That state is saved whenever the full pipeline runs
+(save_state) and advanced by every append:
+
+    python cli.py append --gdp gdp_2021_2022.csv
+
+New rows are processed with the same functions as the full run (name fixes, ISO codes,
+real growth, classification) and appended to the CSV and as new per-year part files of
+the Parquet dataset. The cost is proportional to the new rows plus one state row per
+country. Appended years are recorded in the state: a later full run rebuilds only
+YEAR_START-YEAR_END from the source files, so `cli.py process` refuses to run over them
+unless told to discard them. The dashboard is not appended to; run `cli.py generate`
+(or the query server, which reloads on its own) to show the new years.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import data_processor
+from columnar_store import PARQUET_PATH, append_parquet, has_pyarrow
+from instrumentation import instrumented
+
+STATE_PATH = ".cache/append_state.json"
+
+
+def build_state(gdp_clean, year_end=data_processor.YEAR_END):
+    """Last GDP row per country of a process_gdp() result, plus the last processed year."""
+    last = gdp_clean.sort_values(['Country', 'Year'], kind='stable').groupby('Country', observed=True).tail(1)
+    countries = {
+        str(country): [int(year), None if pd.isna(gdp) else float(gdp)]
+        for country, year, gdp in zip(last['Country'], last['Year'], last['GDP'])
+    }
+    return {"year_end": int(year_end), "countries": countries, "appended": []}
+
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No append state at {path}; run the full pipeline (cli.py process) first")
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def appended_years(path=STATE_PATH):
+    """Years added by append_years() since the last full run; empty without a state file."""
+    try:
+        return load_state(path).get("appended", [])
+    except (OSError, ValueError):
+        return []
+
+
+def growth_from_state(gdp_new, state):
+    """
+    GDP_Growth for new rows, chaining each country's first new year onto its stored last
+    GDP. Returns the new rows sorted by Country/Year, with growth.
+    """
+    gdp_new = gdp_new.sort_values(by=['Country', 'Year']).reset_index(drop=True)
+    countries_with_rows = set(gdp_new['Country'])
+    names = [name for name in state["countries"] if name in countries_with_rows]
+    # State rows get index labels after the new rows so growth can be mapped back by label
+    previous = pd.DataFrame({
+        'Country': names,
+        'Year': [state["countries"][name][0] for name in names],
+        'GDP': np.array([state["countries"][name][1] for name in names], dtype='float64'),
+    }, index=pd.RangeIndex(len(gdp_new), len(gdp_new) + len(names)))
+    combined = pd.concat([previous, gdp_new[['Country', 'Year', 'GDP']].astype({'Country': object})])
+    combined = combined.sort_values(['Country', 'Year'], kind='stable')
+    growth = combined.groupby('Country')['GDP'].pct_change() * 100
+    gdp_new['GDP_Growth'] = growth.loc[gdp_new.index]
+    return gdp_new
+
+
+def advance_countries(state, gdp_rows):
+    """Per-country state moved on to each country's last row in `gdp_rows` (sorted by Country/Year)."""
+    countries = dict(state["countries"])
+    last = gdp_rows.groupby('Country', observed=True).tail(1)
+    for country, year, gdp in zip(last['Country'], last['Year'], last['GDP']):
+        countries[str(country)] = [int(year), None if pd.isna(gdp) else float(gdp)]
+    return countries
+
+
+@instrumented("append_years")
+def append_years(gdp_raw, inflation_raw, state_path=STATE_PATH, output_path=data_processor.OUTPUT_PATH,
+                 parquet_path=PARQUET_PATH):
+    """
+    Process the years after the stored state's last year and append them to the
+    processed CSV (and Parquet file). Returns the appended rows. The state only moves
+    on to the last year actually written: GDP years the merge dropped (e.g. inflation
+    does not cover them yet) are processed again by the next append.
+    """
+    state = load_state(state_path)
+    first_year = state["year_end"] + 1
+    last_year = int(gdp_raw['year'].max()) if len(gdp_raw) else state["year_end"]
+    if last_year < first_year:
+        print(f"No GDP rows after {state['year_end']}; nothing to append.")
+        return pd.DataFrame()
+
+    print(f"Appending {first_year}-{last_year}...")
+    gdp_new = data_processor.prepare_gdp(gdp_raw, first_year, last_year)
+    gdp_new = growth_from_state(gdp_new, state)
+    gdp_new = gdp_new[['Country', 'Year', 'GDP', 'GDP_Growth', 'state']]
+    inflation_new = data_processor.process_inflation(inflation_raw, year_start=first_year, year_end=last_year)
+
+    new_rows = data_processor.finalize_data(data_processor.merge_data(gdp_new, inflation_new))
+    if new_rows.empty:
+        print(f"No rows for {first_year}-{last_year} after merging with inflation; nothing appended.")
+        return new_rows
+    written_end = int(new_rows['Year'].max())
+    if written_end < last_year:
+        print(f"Warning: the merge produced no rows after {written_end}; "
+              f"GDP years up to {last_year} are left for a later append")
+
+    # Parquet first: it rejects years it already holds before the CSV is touched
+    if parquet_path and has_pyarrow() and os.path.exists(parquet_path):
+        append_parquet(new_rows, parquet_path)
+        print(f"Appended {len(new_rows)} rows to {parquet_path}")
+    new_rows.to_csv(output_path, mode="a", header=not os.path.exists(output_path), index=False)
+    print(f"Appended {len(new_rows)} rows to {output_path}")
+
+    appended = state.get("appended", []) + sorted(int(year) for year in new_rows['Year'].unique())
+    countries = advance_countries(state, gdp_new[gdp_new['Year'] <= written_end])
+    save_state({"year_end": written_end, "countries": countries, "appended": appended}, state_path)
+    return new_rows
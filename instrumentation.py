@@ -0,0 +1,197 @@
+"""
+Stage-level timing and resource tracing.
+
+Wrap work in `with stage("name", rows_in=...) as span:` (or decorate a function with
+@instrumented("name")). Outside an active run these are cheap no-ops; inside one
+they record wall time, rows in/out, RSS growth and, optionally, tracemalloc
+allocation deltas and cProfile hot spots. A run is written as one JSON trace;
+`with traced_run("name"):` writes it even when the run fails, with the error recorded.
+"""
+import contextlib
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TRACE_DIR = ".cache/traces"
+PROFILE_TOP = 15
+
+_active_run = None
+
+
+def _max_rss_bytes():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _row_count(value):
+    if isinstance(value, (tuple, list)):
+        counts = [_row_count(item) for item in value]
+        return None if any(count is None for count in counts) else sum(counts)
+    return len(value) if hasattr(value, "shape") and hasattr(value, "__len__") else None
+
+
+class Run:
+    def __init__(self, name, profile=False, trace_memory=False):
+        self.name = name
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.spans = []
+        self.error = None
+        self._stack = []
+        self.started = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None):
+        span = {
+            "name": name,
+            "parent": self._stack[-1]["name"] if self._stack else None,
+            "rows_in": rows_in,
+            "rows_out": None,
+        }
+        self._stack.append(span)
+        rss_before = _max_rss_bytes()
+        if self.trace_memory:
+            # reset_peak() is global: fold the peak so far into the enclosing span first
+            current, peak = tracemalloc.get_traced_memory()
+            if len(self._stack) > 1:
+                parent = self._stack[-2]
+                parent["_peak"] = max(parent.get("_peak", 0), peak)
+            tracemalloc.reset_peak()
+            mem_before = current
+        profiler = None
+        # cProfile cannot nest, so only the outermost stage is profiled
+        if self.profile and len(self._stack) == 1:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span["seconds"] = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                span["profile"] = _top_functions(profiler)
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, span.pop("_peak", 0))
+                if len(self._stack) > 1:
+                    parent = self._stack[-2]
+                    parent["_peak"] = max(parent.get("_peak", 0), peak)
+                span["alloc_delta_bytes"] = current - mem_before
+                span["alloc_peak_bytes"] = peak - mem_before
+            rss_after = _max_rss_bytes()
+            if rss_before is not None:
+                span["max_rss_growth_bytes"] = rss_after - rss_before
+            self._stack.pop()
+            self.spans.append(span)
+
+    def to_dict(self):
+        return {
+            "run": self.name,
+            "started": self.started.isoformat(),
+            "seconds": time.perf_counter() - self._start,
+            "max_rss_bytes": _max_rss_bytes(),
+            "python": sys.version.split()[0],
+            "error": self.error,
+            "stages": self.spans,
+        }
+
+    def write(self, path=None):
+        if path is None:
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            path = os.path.join(TRACE_DIR, f"{self.name}-{self.started.strftime('%Y%m%dT%H%M%S')}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        return path
+
+
+def _top_functions(profiler, limit=PROFILE_TOP):
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({"function": f"{os.path.basename(filename)}:{line}({func})", "calls": ncalls,
+                     "tottime": tottime, "cumtime": cumtime})
+    rows.sort(key=lambda row: row["cumtime"], reverse=True)
+    return rows[:limit]
+
+
+def start_run(name, profile=None, trace_memory=None):
+    """
+    Begin recording. profile / trace_memory default to the ECON_PROFILE and
+    ECON_TRACEMALLOC environment variables.
+    """
+    global _active_run
+    if profile is None:
+        profile = os.environ.get("ECON_PROFILE") == "1"
+    if trace_memory is None:
+        trace_memory = os.environ.get("ECON_TRACEMALLOC") == "1"
+    _active_run = Run(name, profile=profile, trace_memory=trace_memory)
+    return _active_run
+
+
+def finish_run(path=None):
+    """Stop recording and write the JSON trace; returns its path (None if no run was active)."""
+    global _active_run
+    run, _active_run = _active_run, None
+    if run is None:
+        return None
+    if run.trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    trace_path = run.write(path)
+    print(f"Trace written to {trace_path}")
+    return trace_path
+
+
+@contextlib.contextmanager
+def traced_run(name, profile=None, trace_memory=None, path=None):
+    """start_run() ... finish_run() around a block; a failing block still writes its trace."""
+    run = start_run(name, profile=profile, trace_memory=trace_memory)
+    try:
+        yield run
+    except BaseException as e:
+        run.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        finish_run(path)
+
+
+@contextlib.contextmanager
+def stage(name, rows_in=None):
+    if _active_run is None:
+        yield {}
+        return
+    with _active_run.stage(name, rows_in=rows_in) as span:
+        yield span
+
+
+def instrumented(name):
+    """Decorator form of stage(): rows in/out are taken from DataFrame arguments and results."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active_run is None:
+                return func(*args, **kwargs)
+            with stage(name, rows_in=_row_count(args) if args else None) as span:
+                result = func(*args, **kwargs)
+                span["rows_out"] = _row_count(result)
+                return result
+        return wrapper
+    return decorator
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+from importlib import metadata
+
+import numpy as np
+import pandas as pd
+
+CACHE_PATH = ".cache/iso3_cache.json"
+
+# Manual dictionary for edge cases that fuzzy search gets wrong or misses
+MANUAL_ISO3 = {
+    "Russia": "RUS",
+    "Russian Federation": "RUS",
+    "the United States": "USA",
+    "United States": "USA",
+    "China": "CHN",
+    "China, People's Republic of": "CHN",
+    "South Korea": "KOR",
+    "Korea, Republic of": "KOR",
+    "Turkey": "TUR",
+    "Türkiye, Republic of": "TUR",
+    "Vietnam": "VNM",
+    "Venezuela, Bolivarian Republic of": "VEN",
+    "Iran, Islamic Republic of": "IRN",
+    "Congo, Dem. Rep. of the": "COD",
+    "Congo (gold)": "COD",
+    "Congo, Republic of": "COG",
+    "Congo (Brazzaville)": "COG",
+    "Tanzania": "TZA",
+    "Egypt": "EGY",
+    "Syrian Arab Republic": "SYR",
+    "Lao P.D.R.": "LAO",
+    "Kyrgyz Republic": "KGZ",
+    "Slovak Republic": "SVK",
+    "Czech Republic": "CZE",
+    "Bahamas, The": "BHS",
+    "Gambia, The": "GMB",
+    "St. Lucia": "LCA",
+    "St. Vincent and the Grenadines": "VCT",
+    "St. Kitts and Nevis": "KNA",
+    "Bolivia": "BOL",
+    "Brunei Darussalam": "BRN",
+    "Trinidad and Tobago": "TTO",
+    "Micronesia, Fed. States of": "FSM",
+    "Cape Verde": "CPV",
+    "Cabo Verde": "CPV",
+    "Yemen, Republic of": "YEM",
+    # Fuzzy search maps these onto a neighbour's code (Niger -> NGA, Kosovo -> SRB, ...)
+    "Niger": "NER",
+    "Colombia": "COL",
+    "Kosovo": "XKX",
+    "Hong Kong SAR": "HKG",
+    "Macao SAR": "MAC"
+}
+
+
+def _cache_key():
+    """Cached lookups are only valid for the same pycountry release and overrides."""
+    try:
+        version = metadata.version("pycountry")
+    except metadata.PackageNotFoundError:
+        version = "unknown"
+    overrides = json.dumps(MANUAL_ISO3, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(f"{version}\n{overrides}".encode("utf-8")).hexdigest()
+
+
+def load_cache(path=CACHE_PATH):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if payload.get("key") != _cache_key():
+        return {}
+    return payload.get("names", {})
+
+
+def save_cache(names, path=CACHE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"key": _cache_key(), "names": names}, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def get_iso3(country_name):
+    """Map country names to ISO-3 codes with a manual dictionary for edge cases."""
+    if country_name in MANUAL_ISO3:
+        return MANUAL_ISO3[country_name]
+
+    import pycountry
+    try:
+        res = pycountry.countries.search_fuzzy(country_name)
+        if res:
+            return res[0].alpha_3
+    except LookupError:
+        pass
+    return None
+
+
+def resolve_iso3(countries, cache_path=None):
+    """
+    Map a Series of country names to ISO-3 codes.
+    Each distinct name is resolved once (misses are cached too) and the results
+    are broadcast back to the rows through the categorical codes.
+    cache_path defaults to CACHE_PATH; pass "" to skip the on-disk cache.
+    """
+    if cache_path is None:
+        cache_path = CACHE_PATH
+    categorical = countries.astype("category")
+    names = categorical.cat.categories
+
+    cache = load_cache(cache_path) if cache_path else {}
+    missing = [name for name in names if name not in cache]
+    for name in missing:
+        cache[name] = get_iso3(name)
+    if missing and cache_path:
+        save_cache(cache, cache_path)
+
+    # Code -1 (missing country name) points at the trailing None
+    resolved = np.array([cache[name] for name in names] + [None], dtype=object)
+    return pd.Series(resolved[categorical.cat.codes.to_numpy()], index=countries.index, name=countries.name)
@@ -0,0 +1,168 @@
+"""
+Multi-source join on (Country, Year) using integer keys.
+
+Country names are first encoded into one dictionary shared by every source. Each
+(country_code, year) pair is then packed into one int64 key, so the join compares
+integers instead of hashing long Unicode names. join_frames joins any number of
+in-memory sources in one pass, with a sorted merge over row-index arrays; the output
+DataFrame is assembled once at the end. join_chunked handles sources larger than
+memory. It hash-partitions every chunk to disk and joins one partition at a time.
+"""
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+KEYS = ('Country', 'Year')
+PARTITIONS = 16
+MISSING_KEY = -1
+
+
+def _factorize(values):
+    """(codes, uniques) using the categories directly for categorical input."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories
+    return pd.factorize(values)
+
+
+def encode_countries(columns):
+    """
+    Encode several country columns against one shared, sorted dictionary.
+    Returns (dictionary, [int32 codes per column]) with -1 for missing names.
+    """
+    factorized = [_factorize(column) for column in columns]
+    dictionary = pd.Index(pd.unique(np.concatenate([np.asarray(uniques, dtype=object) for _, uniques in factorized])))
+    dictionary = dictionary.sort_values()
+    encoded = []
+    for codes, uniques in factorized:
+        lookup = np.append(dictionary.get_indexer(uniques), -1).astype(np.int32)
+        encoded.append(lookup[codes])
+    return dictionary, encoded
+
+
+def pack_keys(country_codes, years):
+    """(country_code << 32) | year as int64; MISSING_KEY where either part is missing."""
+    years = pd.to_numeric(pd.Series(years), errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    valid = (country_codes >= 0) & ~np.isnan(years)
+    keys = (country_codes.astype(np.int64) << 32) | np.where(valid, years, 0).astype(np.int64)
+    return np.where(valid, keys, MISSING_KEY)
+
+
+def _match(left_keys, right_keys, how):
+    """
+    Row indices (left, right) of a sorted-merge join. Left order is preserved and
+    duplicate right keys appear in their original order; right index -1 = no match.
+    """
+    order = np.argsort(right_keys, kind='stable')
+    sorted_keys = right_keys[order]
+    lo = np.searchsorted(sorted_keys, left_keys, side='left')
+    counts = np.searchsorted(sorted_keys, left_keys, side='right') - lo
+    counts[left_keys == MISSING_KEY] = 0
+    out_counts = np.maximum(counts, 1) if how == "left" else counts
+
+    left_index = np.repeat(np.arange(len(left_keys)), out_counts)
+    # Position of each output row within its left row's run of matches
+    offsets = np.arange(len(left_index)) - np.repeat(np.cumsum(out_counts) - out_counts, out_counts)
+    has_match = np.repeat(counts > 0, out_counts)
+    right_index = np.full(len(left_index), -1, dtype=np.int64)
+    right_index[has_match] = order[(np.repeat(lo, out_counts) + offsets)[has_match]]
+    return left_index, right_index
+
+
+def _take(frame, index):
+    """Rows of `frame` by position; index -1 gives a row of missing values."""
+    if (index >= 0).all():
+        return frame.take(index).reset_index(drop=True)
+    if len(frame) == 0:
+        return frame.reindex(range(len(index)))
+    taken = frame.take(np.maximum(index, 0)).reset_index(drop=True)
+    return taken.where(np.repeat((index >= 0)[:, None], taken.shape[1], axis=1))
+
+
+def join_frames(frames, on=KEYS, how="inner"):
+    """
+    Join any number of frames on (country, year) in one pass, like chained
+    pd.merge(..., on=on, how=how) with how in {"inner", "left"}. Key columns come from
+    the first frame; the other columns of every frame follow in order and must not overlap.
+    Rows with a missing country or year never match (pd.merge would pair NaN keys).
+    """
+    if how not in ("inner", "left"):
+        raise ValueError(f"Unsupported join type {how!r}")
+    country, year = on
+    seen = set(on)
+    for frame in frames:
+        overlap = seen & (set(frame.columns) - set(on))
+        if overlap:
+            raise ValueError(f"Columns {sorted(overlap)} appear in more than one source")
+        seen |= set(frame.columns)
+
+    _, codes = encode_countries([frame[country] for frame in frames])
+    keys = [pack_keys(code, frame[year]) for code, frame in zip(codes, frames)]
+
+    # indices[i] maps every output row to a row of frames[i]
+    indices = [np.arange(len(frames[0]))]
+    result_keys = keys[0]
+    for frame_keys in keys[1:]:
+        left_index, right_index = _match(result_keys, frame_keys, how)
+        indices = [index[left_index] for index in indices] + [right_index]
+        result_keys = result_keys[left_index]
+
+    parts = [_take(frames[0], indices[0])]
+    for frame, index in zip(frames[1:], indices[1:]):
+        parts.append(_take(frame.drop(columns=list(on)), index))
+    return pd.concat(parts, axis=1)
+
+
+def _partition_of(values, partitions):
+    """Stable hash partition of country names (independent of any per-chunk dictionary)."""
+    return (pd.util.hash_array(np.asarray(values, dtype=object)) % partitions).astype(np.int64)
+
+
+def spill_partitions(chunks, directory, tag, on=KEYS, partitions=PARTITIONS):
+    """Write every chunk's rows into <directory>/<tag>-<partition>-<chunk>.pkl by country hash."""
+    for number, chunk in enumerate(chunks):
+        part = _partition_of(chunk[on[0]], partitions)
+        for p in np.unique(part):
+            chunk[part == p].to_pickle(os.path.join(directory, f"{tag}-{p}-{number}.pkl"))
+
+
+def _read_partition(directory, tag, p):
+    prefix = f"{tag}-{p}-"
+    files = sorted((name for name in os.listdir(directory) if name.startswith(prefix)),
+                   key=lambda name: int(name[len(prefix):-4]))
+    frames = [pd.read_pickle(os.path.join(directory, name)) for name in files]
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+def join_chunked(sources, on=KEYS, how="inner", partitions=PARTITIONS, spill_dir=None):
+    """
+    Out-of-core join_frames for sources given as iterables of DataFrame chunks
+    (e.g. pd.read_csv(..., chunksize=...)). Every source is spilled to disk in
+    `partitions` hash partitions, then each partition is joined in memory and yielded,
+    so at most one partition of every source is held at a time. Rows come out grouped
+    by partition; within a partition the first source's order is kept.
+    """
+    sources = list(sources)
+    directory = tempfile.mkdtemp(prefix="join-", dir=spill_dir)
+    try:
+        for i, chunks in enumerate(sources):
+            spill_partitions(chunks, directory, f"s{i}", on, partitions)
+        empty = [_empty_source(directory, f"s{i}", on) for i in range(len(sources))]
+        for p in range(partitions):
+            parts = [_read_partition(directory, f"s{i}", p) for i in range(len(sources))]
+            if parts[0] is None or (how == "inner" and any(part is None for part in parts)):
+                continue
+            parts = [empty[i] if part is None else part for i, part in enumerate(parts)]
+            yield join_frames(parts, on, how)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _empty_source(directory, tag, on):
+    """Zero-row frame with a source's columns, for partitions where it has no rows."""
+    for name in os.listdir(directory):
+        if name.startswith(f"{tag}-"):
+            return pd.read_pickle(os.path.join(directory, name)).iloc[:0]
+    return pd.DataFrame(columns=list(on))
@@ -1,85 +1,110 @@
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import os
 
+from columnar_store import PARQUET_PATH, has_pyarrow, read_parquet
+from condition_analytics import condition_analytics
+from derived_indicators import DERIVED_INDICATORS, add_derived_indicators
+from figure_builder import DEFAULT_INDICATOR, INDICATORS, build_figure
+from frame_encoder import build_encoded_figure, encode_frames, frame_grids
+from history_builder import build_compact_history, build_country_history, write_history_files
+from html_emitter import HtmlStream, open_output, render, slot, write_figure
+from instrumentation import instrumented, stage, traced_run
+from panel_store import as_panel
+
 DATA_PATH = "datasets/economic_data_1980_2020.csv"
 OUTPUT_FILE = "interactive_economic_map.html"
+HISTORY_DIR = "history"
+
+COLOR_MAP = {
+    "Hyperinflation": "darkviolet",
+    "Overheating": "red",
+    "Stagflation": "orange",
+    "Healthy Growth": "green",
+    "Steady Growth": "yellowgreen",
+    "Recession": "peru",
+    "Deflation": "blue",
+    "Other": "gray",
+    "Unknown": "#444"
+}
+
+# Columns the dashboard actually uses
+MAP_COLUMNS = ['Year', 'ISO_Code', 'Country', 'GDP', 'Inflation', 'Real_GDP_Growth', 'Economic_Condition']
+PANEL_LABEL_COLUMNS = ['Economic_Condition']
+
+def map_columns(indicator=DEFAULT_INDICATOR):
+    """Dataset columns needed for `indicator`; derived layers are computed from MAP_COLUMNS."""
+    if indicator in DERIVED_INDICATORS:
+        return MAP_COLUMNS
+    return list(dict.fromkeys(MAP_COLUMNS + [indicator]))
 
-def generate_map():
+def map_panel(df, indicator=DEFAULT_INDICATOR):
+    """[country x year] panel with the dashboard columns, plus the derived layers if one is shown."""
+    value_columns = [column for column in map_columns(indicator)
+                     if column not in ['Year', 'ISO_Code', 'Country'] + PANEL_LABEL_COLUMNS]
+    if indicator in DERIVED_INDICATORS and isinstance(df, pd.DataFrame) and indicator in df.columns:
+        # Precomputed, e.g. on a wider panel than df (see batch_generator)
+        value_columns.append(indicator)
+    panel = as_panel(df, value_columns, PANEL_LABEL_COLUMNS)
+    if indicator in DERIVED_INDICATORS and indicator not in panel.values:
+        add_derived_indicators(panel)
+    return panel
+
+def load_map_data(columns=MAP_COLUMNS):
+    """Prefer the pre-sorted Parquet artifact, falling back to the CSV."""
+    if os.path.exists(PARQUET_PATH) and has_pyarrow():
+        return read_parquet(PARQUET_PATH, columns=columns)
     if not os.path.exists(DATA_PATH):
-        print(f"Ошибка: Файл {DATA_PATH} не найден.")
-        return
+        return None
+    return pd.read_csv(DATA_PATH, usecols=columns).sort_values(by="Year")
 
-    df = pd.read_csv(DATA_PATH).sort_values(by="Year")
-    
-    color_map = {
-        "Hyperinflation": "darkviolet",
-        "Overheating": "red",
-        "Stagflation": "orange",
-        "Healthy Growth": "green",
-        "Steady Growth": "yellowgreen",
-        "Recession": "peru",
-        "Deflation": "blue",
-        "Other": "gray",
-        "Unknown": "#444"
-    }
-    ordered_conditions = list(color_map.keys())
-
-    first_year = df['Year'].min()
-    dummies = []
-    for cond in ordered_conditions:
-         dummies.append({
-            "Year": first_year,
-            "ISO_Code": "DUM", 
-            "Country": "Initialization",
-            "Economic_Condition": cond,
-            "Real_GDP_Growth": 0,
-            "GDP": 0,
-            "Inflation": 0
-        })
-    df = pd.concat([df, pd.DataFrame(dummies)], ignore_index=True)
-
-    fig_gdp = px.choropleth(
-        df, locations="ISO_Code", locationmode="ISO-3",
-        color="Real_GDP_Growth", animation_frame="Year",
-        color_continuous_scale="RdYlGn", range_color=[-10, 10],
-        hover_data={"Country": True, "GDP": ":,.0f", "Inflation": ":.2f", "Real_GDP_Growth": ":.2f"},
-        template="plotly_dark"
-    )
-    
-    fig_cond = px.choropleth(
-        df, locations="ISO_Code", locationmode="ISO-3",
-        color="Economic_Condition", animation_frame="Year",
-        color_discrete_map=color_map,
-        category_orders={"Economic_Condition": ordered_conditions},
-        hover_data={"Country": True},
-        template="plotly_dark"
-    )
-    
-    fig_gdp.update_traces(showlegend=False)
-    fig_cond.update_traces(showlegend=False)
-    for frame in fig_gdp.frames:
-        for t in frame.data: t.showlegend = False
-    for frame in fig_cond.frames:
-        for t in frame.data: t.showlegend = False
-
-    traces_gdp = list(fig_gdp.data)
-    traces_cond = list(fig_cond.data)
-    
-    final_fig = go.Figure(
-        data=traces_gdp + traces_cond,
-        layout=fig_gdp.layout
-    )
-    final_fig.frames = []
-    
-    frames = []
-    for f1, f2 in zip(fig_gdp.frames, fig_cond.frames):
-        frames.append(go.Frame(data=list(f1.data) + list(f2.data), name=f1.name))
-    final_fig.frames = frames
+@instrumented("generate_map")
+def generate_map(df=None, output_file=OUTPUT_FILE, compact_history=False, history_mode="inline", frame_mode="plotly",
+                 indicator=DEFAULT_INDICATOR, history_dir=HISTORY_DIR, frames_url=None, history_url=None,
+                 compress=None, analytics=False):
+    """
+    Build the dashboard page from a merged DataFrame or a Panel (loaded from disk if None).
+    frames_url / history_url point the page at a server
+    (see query_server.py) instead of embedding the encoded frames / country histories:
+    the page fetches frames_url + year when the slider reaches a year, and
+    history_url + ISO + ".json" when a country is clicked.
+    The page is streamed to `output_file` (a path or a writable binary file object);
+    compress="gzip" / "br" also writes a precompressed sidecar next to it (paths only).
+    history_mode="lazy" writes the per-country files to `history_dir` next to the page,
+    or, for a file object, relative to the working directory.
+    analytics=True adds a panel with condition counts per year and transition probabilities.
+    """
+    to_stream = hasattr(output_file, "write")
+    if to_stream and compress:
+        raise ValueError("compress needs an output path; compress the stream yourself")
+    if df is None:
+        df = load_map_data(map_columns(indicator))
+        if df is None:
+            print(f"Ошибка: Файл {DATA_PATH} не найден.")
+            return
+    # One [country x year] panel shared by the frames and the country histories
+    with stage("generate_map.panel_build", rows_in=len(df)):
+        panel = map_panel(df, indicator)
+    first_year, last_year = int(panel.years[0]), int(panel.years[-1])
+    indicator_label = INDICATORS[indicator]["label"]
+
+    import json
+    json_frames_url = json.dumps(frames_url)
+    if frame_mode == "encoded" or frames_url:
+        # Locations stored once, per-year values as typed arrays; frames are rebuilt in the browser
+        with stage("generate_map.figure_build", rows_in=len(panel)):
+            grids = frame_grids(panel, list(COLOR_MAP.keys()), indicator)
+            # Fetched years are restyled in by the page, so the slider and play button must not animate
+            final_fig = build_encoded_figure(grids, COLOR_MAP, method="skip" if frames_url else "animate")
+        with stage("generate_map.frame_encode"):
+            frames_data = None if frames_url else encode_frames(grids)
+        n_gdp, n_cond = 1, 1
+    else:
+        with stage("generate_map.figure_build", rows_in=len(panel)):
+            final_fig, n_gdp, n_cond = build_figure(panel, COLOR_MAP, indicator)
+        frames_data = None
     
     legend_html = "<b style='font-size:16px'>Conditions</b><br>"
-    for state, color in color_map.items():
+    for state, color in COLOR_MAP.items():
         legend_html += f'<span style="color:{color}; font-size:18px">●</span> {state}<br>'
         
     custom_legend = dict(
@@ -95,8 +120,6 @@ def generate_map():
         font=dict(size=14, color="#fff")
     )
 
-    n_gdp, n_cond = len(traces_gdp), len(traces_cond)
-    vis_gdp = [True]*n_gdp + [False]*n_cond
     final_fig.update_layout(
         template="plotly_dark",
         height=750,
@@ -142,30 +165,34 @@ def generate_map():
             except (ValueError, TypeError):
                 continue
 
-    history_df = df[df['ISO_Code'] != "DUM"][['ISO_Code', 'Country', 'Year', 'Real_GDP_Growth', 'Inflation']].sort_values(['ISO_Code', 'Year'])
-    
-    country_data = {}
-    for iso in history_df['ISO_Code'].unique():
-        country_df = history_df[history_df['ISO_Code'] == iso]
-        country_data[iso] = {
-            "name": country_df['Country'].iloc[0],
-            "years": country_df['Year'].tolist(),
-            "gdp": country_df['Real_GDP_Growth'].tolist(),
-            "inflation": country_df['Inflation'].tolist()
-        }
-    
-    import json
-    json_data = json.dumps(country_data)
+    with stage("generate_map.history_build", rows_in=len(panel)):
+        if history_url:
+            history_data = None
+            json_history_url = json.dumps(history_url)
+        elif history_mode == "lazy":
+            # Per-country files next to the page, fetched on click
+            page_dir = "" if to_stream else os.path.dirname(os.fspath(output_file))
+            write_history_files(build_country_history(panel), os.path.join(page_dir, history_dir))
+            history_data = None
+            json_history_url = json.dumps(history_dir + "/")
+        else:
+            history_data = build_compact_history(panel) if compact_history else build_country_history(panel)
+            json_history_url = "null"
     json_custom_legend = json.dumps(custom_legend)
 
-    map_html = final_fig.to_html(include_plotlyjs='cdn', full_html=False, div_id='main-map')
-    
-    full_html = f"""
+    analytics_data = None
+    if analytics:
+        with stage("generate_map.condition_analytics", rows_in=len(panel)):
+            analytics_data = condition_analytics(panel).dashboard_payload()
+            analytics_data["colors"] = [COLOR_MAP.get(name, COLOR_MAP["Unknown"]) for name in analytics_data["conditions"]]
+
+    # Large values are streamed into the slots instead of being interpolated
+    template = f"""
     <!DOCTYPE html>
     <html>
     <head>
         <meta charset="utf-8" />
-        <title>Economic Dashboard 1980-2020</title>
+        <title>Economic Dashboard {first_year}-{last_year}</title>
         <style>
             body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; margin: 0; padding: 20px; background: #121212; color: #e0e0e0; }}
             .container {{ display: flex; flex-direction: column; gap: 20px; max-width: 1600px; margin: auto; }}
@@ -200,12 +227,12 @@ def generate_map():
     </head>
     <body>
         <div class="container">
-            <h1>Global Economic Dynamics (1980 - 2020)</h1>
+            <h1>Global Economic Dynamics ({first_year} - {last_year})</h1>
             <div class="card" style="padding-bottom: 10px;">
                 <div class="controls-bar">
                     <div class="btn-group" id="view-controls">
                         <span class="btn-label">Layer:</span>
-                        <button class="btn active" onclick="switchView('gdp', this)">GDP Growth</button>
+                        <button class="btn active" onclick="switchView('gdp', this)">{indicator_label}</button>
                         <button class="btn" onclick="switchView('cond', this)">Economic Condition</button>
                     </div>
                     <div class="btn-group" id="projection-controls">
@@ -215,7 +242,7 @@ def generate_map():
                     </div>
                 </div>
                 <div id="map-container">
-                    {map_html}
+                    {slot('map')}
                 </div>
             </div>
             <div class="card" id="chart-container" style="min-height: 450px; position: relative;">
@@ -225,10 +252,49 @@ def generate_map():
                 <div id="selected-country-header"></div>
                 <div id="line-chart" style="height: 450px; width: 100%;"></div>
             </div>
+            <div class="card" id="analytics-container" style="display: none;">
+                <div id="condition-counts" style="height: 400px; width: 100%;"></div>
+                <div id="condition-transitions" style="height: 450px; width: 100%;"></div>
+            </div>
         </div>
 
         <script>
-            const countryHistory = {json_data};
+            const countryHistory = {slot('history')};
+            const historyUrl = {json_history_url};
+            const HISTORY_CACHE_SIZE = 32;
+            const historyCache = new Map();
+
+            // Compact layout stores one shared years axis instead of per-country year lists
+            function getHistory(iso) {{
+                if (countryHistory.countries) {{
+                    const entry = countryHistory.countries[iso];
+                    return entry && {{ name: entry.name, years: countryHistory.years, gdp: entry.gdp, inflation: entry.inflation }};
+                }}
+                return countryHistory[iso];
+            }}
+
+            // Inline histories resolve immediately; lazy ones are fetched once and kept in a small LRU
+            function loadHistory(iso) {{
+                if (!historyUrl) return Promise.resolve(getHistory(iso));
+                if (historyCache.has(iso)) {{
+                    const cached = historyCache.get(iso);
+                    historyCache.delete(iso);
+                    historyCache.set(iso, cached);
+                    return cached;
+                }}
+                const request = fetch(historyUrl + encodeURIComponent(iso) + '.json')
+                    .then(response => response.ok ? response.json() : null)
+                    .catch(err => {{
+                        console.error('Failed to load history for', iso, err);
+                        historyCache.delete(iso);
+                        return null;
+                    }});
+                historyCache.set(iso, request);
+                if (historyCache.size > HISTORY_CACHE_SIZE) {{
+                    historyCache.delete(historyCache.keys().next().value);
+                }}
+                return request;
+            }}
             
             const mapDiv = document.getElementById('main-map');
             const chartPlaceholder = document.getElementById('chart-placeholder');
@@ -241,6 +307,143 @@ def generate_map():
             const vis_gdp = Array(n_gdp).fill(true).concat(Array(n_cond).fill(false));
             const vis_cond = Array(n_gdp).fill(false).concat(Array(n_cond).fill(true));
             const customLegend = {json_custom_legend};
+            const encodedFrames = {slot('frames')};
+            const framesUrl = {json_frames_url};
+            const conditionAnalytics = {slot('analytics')};
+            const FRAME_MS = 500;
+
+            function decodeTyped(b64, TypedArray) {{
+                const binary = atob(b64);
+                const bytes = new Uint8Array(binary.length);
+                for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+                return new TypedArray(bytes.buffer);
+            }}
+
+            // Rebuild one frame per year from the shared locations list and typed value arrays
+            function buildFrames(encoded) {{
+                const n = encoded.locations.length;
+                const value = decodeTyped(encoded.value, Float32Array);
+                const gdp = decodeTyped(encoded.gdp, Float64Array);
+                const inflation = decodeTyped(encoded.inflation, Float32Array);
+                const condition = decodeTyped(encoded.condition, Uint8Array);
+                return encoded.years.map((year, y) => {{
+                    const z = new Array(n), custom = new Array(n), codes = new Array(n), labels = new Array(n);
+                    for (let i = 0, k = y * n; i < n; i++, k++) {{
+                        z[i] = Number.isNaN(value[k]) ? null : value[k];
+                        custom[i] = [gdp[k], inflation[k]];
+                        const code = condition[k];
+                        codes[i] = code === 255 ? null : code;
+                        labels[i] = code === 255 ? null : encoded.conditions[code];
+                    }}
+                    return {{
+                        name: String(year),
+                        data: [{{ z: z, customdata: custom }}, {{ z: codes, customdata: labels }}],
+                        traces: [0, 1]
+                    }};
+                }});
+            }}
+
+            // Remote playback: a year is fetched from framesUrl (in the encoded payload) when the slider
+            // reaches it, kept for replays, and the following year is prefetched
+            function createRemotePlayer(url, years) {{
+                const loaded = new Map();
+                let current = 0, requested = 0;
+
+                function load(y) {{
+                    if (!loaded.has(y)) {{
+                        loaded.set(y, fetch(url + encodeURIComponent(years[y]))
+                            .then(response => {{
+                                if (!response.ok) throw new Error(`HTTP ${{response.status}}`);
+                                return response.json();
+                            }})
+                            .then(encoded => buildFrames(encoded)[0].data)
+                            .catch(err => {{
+                                loaded.delete(y);
+                                throw err;
+                            }}));
+                    }}
+                    return loaded.get(y);
+                }}
+
+                // Only the most recently requested year is drawn, whatever order the responses arrive in
+                function show(y) {{
+                    requested = y;
+                    load(y).then(data => {{
+                        if (y !== requested) return;
+                        Plotly.restyle(mapDiv, {{
+                            z: [data[0].z, data[1].z],
+                            customdata: [data[0].customdata, data[1].customdata]
+                        }}, [0, 1]);
+                        current = y;
+                        if (y < years.length - 1) load(y + 1).catch(() => {{}});
+                    }}).catch(err => console.error('Failed to load frame', years[y], err));
+                }}
+
+                return {{ show: show, current: () => current, last: years.length - 1 }};
+            }}
+
+            // Drives the inert slider and play button of a page whose frames are applied by a player;
+            // playback waits on player.current(), so a year still loading is shown before moving on
+            function attachPlayer(player) {{
+                let timer = null;
+                const stop = () => {{ clearInterval(timer); timer = null; }};
+                const play = () => {{
+                    if (timer) return;
+                    if (player.current() >= player.last) player.show(0);
+                    timer = setInterval(() => {{
+                        if (player.current() >= player.last) return stop();
+                        const next = player.current() + 1;
+                        player.show(next);
+                        Plotly.relayout(mapDiv, {{ 'sliders[0].active': next }});
+                    }}, FRAME_MS);
+                }};
+                mapDiv.on('plotly_sliderchange', event => {{
+                    if (event.interaction === false) return;  // our own relayout during playback
+                    stop();
+                    player.show(event.slider.active);
+                }});
+                mapDiv.on('plotly_buttonclicked', event => event.button.name === 'play' ? play() : stop());
+            }}
+
+            // Optional condition panel: countries per condition per year and next-year transition probabilities
+            function renderAnalytics(data) {{
+                document.getElementById('analytics-container').style.display = 'block';
+                const darkLayout = {{
+                    template: 'plotly_dark',
+                    font: {{ color: '#fff' }},
+                    paper_bgcolor: 'rgba(0,0,0,0)',
+                    plot_bgcolor: 'rgba(0,0,0,0)'
+                }};
+                const bars = data.conditions.map((name, c) => ({{
+                    x: data.years,
+                    y: data.counts[c],
+                    name: name,
+                    type: 'bar',
+                    marker: {{ color: data.colors[c] }}
+                }}));
+                Plotly.newPlot('condition-counts', bars, Object.assign({{
+                    title: '<b>Countries per Economic Condition</b>',
+                    barmode: 'stack',
+                    legend: {{ orientation: 'h', y: -0.15 }}
+                }}, darkLayout), {{responsive: true}});
+
+                const rowLabels = data.conditions.map((name, c) =>
+                    data.meanSpell[c] === null ? name : `${{name}} (${{data.meanSpell[c]}}y)`);
+                Plotly.newPlot('condition-transitions', [{{
+                    z: data.transitions,
+                    x: data.conditions,
+                    y: rowLabels,
+                    type: 'heatmap',
+                    colorscale: 'Blues',
+                    zmin: 0,
+                    zmax: 1,
+                    hovertemplate: '%{{y}} → %{{x}}: %{{z:.0%}}<extra></extra>'
+                }}], Object.assign({{
+                    title: '<b>Next-Year Condition</b> (rows: current condition, mean spell length)',
+                    yaxis: {{ autorange: 'reversed' }},
+                    margin: {{ l: 180 }}
+                }}, darkLayout), {{responsive: true}});
+            }}
 
             window.switchView = function(mode, btn) {{
                 console.log('Switching view to:', mode);
@@ -283,7 +486,14 @@ def generate_map():
             const checkReady = setInterval(() => {{
                 if (window.Plotly && mapDiv && mapDiv.data) {{
                     clearInterval(checkReady);
+                    if (encodedFrames) Plotly.addFrames(mapDiv, buildFrames(encodedFrames));
+                    if (framesUrl) {{
+                        // The first year is inline; slider labels may be annotated, so take years from the steps' frame names
+                        const years = mapDiv.layout.sliders[0].steps.map(step => step.args[0][0]);
+                        attachPlayer(createRemotePlayer(framesUrl, years));
+                    }}
                     Plotly.restyle(mapDiv, {{ visible: vis_gdp }});
+                    if (conditionAnalytics) renderAnalytics(conditionAnalytics);
                 }}
             }}, 100);
 
@@ -303,8 +513,13 @@ def generate_map():
                         const iso = point.location;
                         console.log('ISO Code detected from click:', iso);
                         
-                        if (iso && countryHistory[iso]) {{
-                            const name = countryHistory[iso].name;
+                        if (!iso) return;
+                        loadHistory(iso).then(history => {{
+                            if (!history) {{
+                                console.warn('No data found for ISO code:', iso);
+                                return;
+                            }}
+                            const name = history.name;
                             console.log('Found history for country:', name);
                             
                             chartPlaceholder.style.display = 'none';
@@ -312,15 +527,13 @@ def generate_map():
                             countryHeader.style.display = 'block';
                             
                             setTimeout(() => {{
-                                renderChart(countryHistory[iso]).then(() => {{
+                                renderChart(history).then(() => {{
                                     window.scrollTo({{ top: document.body.scrollHeight, behavior: 'smooth' }});
                                 }}).catch(err => {{
                                     console.error('Error during scroll or render sequence:', err);
                                 }});
                             }}, 50);
-                        }} else {{
-                            console.warn('No data found for ISO code:', iso);
-                        }}
+                        }});
                     }});
                 }}
             }}, 500);
@@ -402,10 +615,28 @@ def generate_map():
     </html>
     """
 
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        f.write(full_html)
-        
-    print(f"Готово! Дашборд создан в {OUTPUT_FILE}")
+    # Figure objects to plain dicts; their JSON is encoded while streaming in generate_map.write
+    with stage("generate_map.serialize"):
+        fig_dict = final_fig.to_dict()
+
+    slots = {
+        "map": lambda out: write_figure(out, fig_dict, 'main-map'),
+        "history": lambda out: out.write_json(history_data),
+        "frames": lambda out: out.write_json(frames_data),
+        "analytics": lambda out: out.write_json(analytics_data),
+    }
+    with stage("generate_map.write") as span:
+        if to_stream:
+            out = HtmlStream(output_file)
+            render(out, template, slots)
+        else:
+            with open_output(output_file, compress) as out:
+                render(out, template, slots)
+        span["bytes"] = out.bytes_written
+
+    if not to_stream:
+        print(f"Готово! Дашборд создан в {output_file}")
 
 if __name__ == "__main__":
-    generate_map()
\ No newline at end of file
+    with traced_run("map_generator"):
+        generate_map()
\ No newline at end of file
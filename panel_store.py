@@ -0,0 +1,136 @@
+"""
+Dense [country x year] panel of the merged dataset.
+
+Countries (ISO_Code) and years are integer-coded axes; every numeric column becomes
+one float64 grid and every label column (e.g. Economic_Condition) one int16 code
+grid against its categories. A year is column j of every grid and a country is row i,
+so map frames and history charts are array views instead of filtered/sorted copies.
+"""
+import numpy as np
+import pandas as pd
+
+KEY_COLUMNS = ['ISO_Code', 'Year']
+NAME_COLUMN = 'Country'
+PLACEHOLDER_ISO = "DUM"  # legacy placeholder rows, never drawn
+
+
+class Panel:
+    def __init__(self, countries, years, names, present, values, labels):
+        self.countries = countries   # sorted ISO codes, axis 0
+        self.years = years           # sorted years, axis 1
+        self.names = names           # display name per country
+        self.present = present       # bool [country x year]: a row exists for this key
+        self.values = values         # {column: float64 [country x year], NaN where missing}
+        self.labels = labels         # {column: (categories, int16 [country x year], -1 where missing)}
+        self._country_index = {iso: i for i, iso in enumerate(countries.tolist())}
+        self._year_index = {year: j for j, year in enumerate(years.tolist())}
+        self.duplicates = 0
+
+    @classmethod
+    def from_frame(cls, df, columns=None, label_columns=None):
+        """
+        Build from a merged frame (one row per ISO_Code/Year). Numeric columns become value
+        grids and the remaining text columns label grids unless given explicitly. If a key
+        occurs more than once, the last row wins; the number of dropped rows is kept in
+        `duplicates` and reported with a warning.
+        """
+        df = df[df['ISO_Code'] != PLACEHOLDER_ISO]
+        if columns is None:
+            columns = [c for c in df.select_dtypes('number').columns if c not in KEY_COLUMNS]
+        if label_columns is None:
+            label_columns = [c for c in df.columns
+                             if c not in KEY_COLUMNS + [NAME_COLUMN] + list(columns)]
+
+        countries, country_idx = np.unique(df['ISO_Code'].to_numpy(dtype=str), return_inverse=True)
+        years, year_idx = np.unique(df['Year'].to_numpy(), return_inverse=True)
+        shape = (len(countries), len(years))
+
+        # Last occurrence of each key
+        keys = country_idx * len(years) + year_idx
+        _, last_from_end = np.unique(keys[::-1], return_index=True)
+        rows = len(keys) - 1 - last_from_end
+        ci, yj = country_idx[rows], year_idx[rows]
+
+        present = np.zeros(shape, dtype=bool)
+        present[ci, yj] = True
+
+        # Name from each country's earliest row (first in frame order among equal years)
+        order = np.lexsort((np.arange(len(keys)), year_idx, country_idx))
+        sorted_countries = country_idx[order]
+        first = order[np.r_[True, sorted_countries[1:] != sorted_countries[:-1]]] if len(order) else order
+        names = np.empty(len(countries), dtype=object)
+        names[country_idx[first]] = df[NAME_COLUMN].to_numpy(dtype=object)[first]
+
+        values = {}
+        for column in columns:
+            grid = np.full(shape, np.nan)
+            grid[ci, yj] = df[column].to_numpy(dtype="float64", na_value=np.nan)[rows]
+            values[column] = grid
+
+        labels = {}
+        for column in label_columns:
+            codes, categories = pd.factorize(df[column])
+            grid = np.full(shape, -1, dtype=np.int16)
+            grid[ci, yj] = codes[rows]
+            labels[column] = (list(categories), grid)
+
+        panel = cls(countries, years, names, present, values, labels)
+        panel.duplicates = len(keys) - len(rows)
+        if panel.duplicates:
+            seen = np.zeros(len(keys), dtype=bool)
+            seen[rows] = True
+            repeated = np.unique(countries[country_idx[~seen]]).tolist()
+            print(f"Warning: {panel.duplicates} rows share an ISO_Code/Year key with a later row and were dropped "
+                  f"(ISO codes: {repeated[:10]})")
+        return panel
+
+    def __len__(self):
+        return int(self.present.sum())
+
+    def country_index(self, iso):
+        return self._country_index.get(iso)
+
+    def year_index(self, year):
+        return self._year_index.get(year)
+
+    def year_slice(self, year):
+        """{column: [country] view} for one year, or None if the year is not in the panel."""
+        j = self.year_index(year)
+        if j is None:
+            return None
+        return {column: grid[:, j] for column, grid in self.values.items()}
+
+    def country_slice(self, iso):
+        """{column: [year] view} for one country, or None if the country is not in the panel."""
+        i = self.country_index(iso)
+        if i is None:
+            return None
+        return {column: grid[i] for column, grid in self.values.items()}
+
+    def lookup(self, column, countries, years):
+        """Values of `column` at (country, year) pairs of two aligned arrays; NaN for keys not in the panel."""
+        countries = np.asarray(countries, dtype=str)
+        years = np.asarray(years)
+        i = np.minimum(np.searchsorted(self.countries, countries), len(self.countries) - 1)
+        j = np.minimum(np.searchsorted(self.years, years), len(self.years) - 1)
+        found = (self.countries[i] == countries) & (self.years[j] == years) & self.present[i, j]
+        return np.where(found, self.values[column][i, j], np.nan)
+
+    def codes(self, column, categories):
+        """Label grid re-coded to positions in `categories`; -1 for missing or unlisted labels."""
+        own_categories, grid = self.labels[column]
+        position = {name: code for code, name in enumerate(categories)}
+        lookup = np.array([position.get(name, -1) for name in own_categories] + [-1], dtype=np.int16)
+        return lookup[grid]
+
+
+def nullable(values):
+    """Float array as an object array with None (JSON null) in place of NaN."""
+    return np.where(np.isnan(values), None, values)
+
+
+def as_panel(data, columns=None, label_columns=None):
+    """`data` if it is already a Panel, otherwise Panel.from_frame(data, ...)."""
+    if isinstance(data, Panel):
+        return data
+    return Panel.from_frame(data, columns, label_columns)
@@ -0,0 +1,250 @@
+import hashlib
+import inspect
+import os
+import pickle
+import shutil
+import sys
+
+CACHE_DIR = ".cache/pipeline"
+
+# Bump to invalidate every cached stage at once (e.g. after a pandas upgrade)
+PIPELINE_VERSION = "1"
+# Cached outputs kept per stage name; older ones are removed by Pipeline.evict()
+CACHE_KEEP = 3
+
+
+# (path, mtime_ns, size) -> sha256, so a file checked twice in one process is read once
+_file_digests = {}
+
+
+def file_digest(path, block_size=1 << 20):
+    """sha256 of a file; for a directory (e.g. the Parquet dataset), of its file names and contents."""
+    if os.path.isdir(path):
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                digest.update(os.path.relpath(file_path, path).encode("utf-8"))
+                digest.update(file_digest(file_path, block_size).encode())
+        return digest.hexdigest()
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if memo_key in _file_digests:
+        return _file_digests[memo_key]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    _file_digests[memo_key] = digest.hexdigest()
+    return _file_digests[memo_key]
+
+
+def code_digest(*objects):
+    """Hash the source of the functions/modules a stage depends on."""
+    digest = hashlib.sha256(PIPELINE_VERSION.encode())
+    for obj in objects:
+        digest.update(inspect.getsource(obj).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class Artifact:
+    """A stage output identified by a content digest; the value is loaded only when needed."""
+
+    def __init__(self, digest, path=None, value=None, loaded=False):
+        self.digest = digest
+        self.path = path
+        self._value = value
+        self._loaded = loaded
+
+    @property
+    def value(self):
+        if not self._loaded:
+            with open(self.path, "rb") as f:
+                self._value = pickle.load(f)
+            self._loaded = True
+        return self._value
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _copy_output(source_path, target_path):
+    if os.path.isdir(source_path):
+        _remove(target_path)
+        shutil.copytree(source_path, target_path)
+    else:
+        shutil.copyfile(source_path, target_path)
+
+
+def source(path):
+    """A raw input file, identified by the hash of its content."""
+    return Artifact(file_digest(path), value=path, loaded=True)
+
+
+class Pipeline:
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.executed = []
+        self.reused = []
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _key(self, name, code, inputs, params, config=()):
+        digest = hashlib.sha256(name.encode())
+        digest.update(code.encode())
+        digest.update(repr(list(config)).encode())
+        for artifact in inputs:
+            digest.update(artifact.digest.encode())
+        digest.update(repr(sorted(params.items())).encode())
+        return digest.hexdigest()
+
+    def _reuse(self, name, path):
+        # Refresh the mtime so evict() treats the entry as recently used
+        os.utime(path)
+        print(f"[pipeline] {name}: cached")
+        self.reused.append(name)
+
+    def stage(self, name, func, *inputs, code=(), config=(), **params):
+        """
+        Run func on the input values unless an output for the same inputs, params and
+        code version is already cached. `code` lists extra functions/modules whose
+        source should invalidate the stage when edited; `config` lists module constants
+        (bound as defaults or read at call time) whose repr should do the same.
+        """
+        key = self._key(name, code_digest(func, *code), inputs, params, config)
+        path = os.path.join(self.cache_dir, f"{name}-{key[:20]}.pkl")
+        if os.path.exists(path):
+            self._reuse(name, path)
+            return Artifact(key, path=path)
+
+        print(f"[pipeline] {name}: running")
+        value = func(*[artifact.value for artifact in inputs], **params)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.executed.append(name)
+        return Artifact(key, path=path, value=value, loaded=True)
+
+    def file_stage(self, name, func, output_path, *inputs, code=(), config=(), **params):
+        """
+        Like stage(), for functions that write output_path (a file or a directory). The
+        output is kept in the cache and restored instead of re-running when inputs are unchanged.
+        """
+        key = self._key(name, code_digest(func, *code), inputs, params, config)
+        cached = os.path.join(self.cache_dir, f"{name}-{key[:20]}{os.path.splitext(output_path)[1]}")
+        if os.path.exists(cached):
+            if not os.path.exists(output_path) or file_digest(output_path) != file_digest(cached):
+                _copy_output(cached, output_path)
+            self._reuse(name, cached)
+        else:
+            print(f"[pipeline] {name}: running")
+            func(*[artifact.value for artifact in inputs], output_path, **params)
+            _copy_output(output_path, cached)
+            self.executed.append(name)
+        return Artifact(key, value=output_path, loaded=True)
+
+    def evict(self, keep=CACHE_KEEP):
+        """Remove all but the `keep` most recently used cached outputs of every stage."""
+        by_stage = {}
+        for entry in os.scandir(self.cache_dir):
+            if "-" in entry.name and not entry.name.endswith(".tmp"):
+                by_stage.setdefault(entry.name.rsplit("-", 1)[0], []).append(entry)
+        removed = 0
+        for entries in by_stage.values():
+            entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+            for entry in entries[keep:]:
+                _remove(entry.path)
+                removed += 1
+        return removed
+
+
+def _read_csv(path):
+    import pandas as pd
+    return pd.read_csv(path)
+
+
+def _validate(gdp_df, inflation_df):
+    from validation import validate_inputs
+    return validate_inputs(gdp_df, inflation_df, cache_dir=None)
+
+
+def _merge(gdp_df, inflation_df):
+    import data_processor
+    return data_processor.finalize_data(data_processor.merge_data(gdp_df, inflation_df))
+
+
+def _save_csv(df, output_path):
+    df.to_csv(output_path, index=False)
+
+
+def run(gdp_path=None, inflation_path=None, output_path=None, parquet_path=None, map_path=None, cache_dir=CACHE_DIR):
+    """
+    Incremental rebuild of the whole dashboard. Every stage is keyed by the digests
+    of its inputs, so e.g. a changed inflation file re-runs process_inflation,
+    merge_data and generate_map but reuses the processed GDP data.
+    """
+    import classification
+    import columnar_store
+    import condition_analytics
+    import data_processor
+    import derived_indicators
+    import figure_builder
+    import frame_encoder
+    import history_builder
+    import html_emitter
+    import iso_resolver
+    import join_engine
+    import map_generator
+    import panel_store
+
+    gdp_path, inflation_path = data_processor.input_paths(gdp_path, inflation_path)
+    output_path = output_path or data_processor.OUTPUT_PATH
+    parquet_path = parquet_path or columnar_store.PARQUET_PATH
+    map_path = map_path or map_generator.OUTPUT_FILE
+
+    from incremental import appended_years
+    appended = appended_years()
+    if appended:
+        print(f"Warning: {output_path} holds appended years {appended}; this rebuild drops them")
+
+    pipeline = Pipeline(cache_dir)
+    gdp_raw = pipeline.stage("load_gdp", _read_csv, source(gdp_path))
+    inflation_raw = pipeline.stage("load_inflation", _read_csv, source(inflation_path))
+
+    # Keyed on the whole data_processor module, so a new helper or name mapping used by
+    # prepare_gdp invalidates these stages without having to be listed here
+    years = [data_processor.YEAR_START, data_processor.YEAR_END]
+    gdp = pipeline.stage("process_gdp", data_processor.process_gdp, gdp_raw, code=[data_processor], config=years)
+    inflation = pipeline.stage(
+        "process_inflation", data_processor.process_inflation, inflation_raw, code=[data_processor], config=years,
+    )
+
+    import validation
+    report = pipeline.stage("validate_inputs", _validate, gdp, inflation, code=[validation, iso_resolver])
+    print(report.value.summary())
+
+    merged = pipeline.stage(
+        "merge_data", _merge, gdp, inflation,
+        code=[data_processor, classification, iso_resolver, join_engine],
+    )
+    pipeline.file_stage("save_csv", _save_csv, output_path, merged)
+    if columnar_store.has_pyarrow():
+        pipeline.file_stage("save_parquet", columnar_store.write_parquet, parquet_path, merged, code=[columnar_store])
+    pipeline.file_stage(
+        "generate_map", map_generator.generate_map, map_path, merged,
+        code=[map_generator, figure_builder, frame_encoder, history_builder, html_emitter, panel_store,
+              derived_indicators, condition_analytics],
+    )
+
+    removed = pipeline.evict()
+    print(f"[pipeline] ran {len(pipeline.executed)} stage(s), reused {len(pipeline.reused)}, evicted {removed}")
+    return pipeline
+
+
+if __name__ == "__main__":
+    run(*sys.argv[1:3])
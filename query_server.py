@@ -0,0 +1,209 @@
+"""
+Local HTTP server for the dashboard, backed by the processed dataset held in memory.
+
+    python query_server.py                  # http://127.0.0.1:8050/
+    python query_server.py --port 9000 --indicator Inflation
+
+Instead of baking every frame and country history into one static page, the page
+served at / contains only the first year and fetches the rest on demand: a year's
+frame when the slider reaches it, a country's history when it is clicked.
+
+    GET /api/years               list of years
+    GET /api/frame/<year>        one year in the frame_encoder payload (typed arrays as base64)
+    GET /api/frames              all years in one frame_encoder payload
+    GET /api/history/<ISO>.json  one country's history
+
+Responses are kept in an LRU cache and carry an ETag, so repeat requests are answered
+with 304 Not Modified. The dataset is reloaded when the Parquet/CSV file changes.
+Stdlib only (http.server); no extra dependencies.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from columnar_store import PARQUET_PATH, has_pyarrow
+from figure_builder import DEFAULT_INDICATOR, INDICATORS
+from frame_encoder import encode_frames, encode_year, frame_grids
+from history_builder import build_country_history, history_record
+from map_generator import COLOR_MAP, DATA_PATH, generate_map, load_map_data, map_columns, map_panel
+
+HOST = "127.0.0.1"
+PORT = 8050
+CACHE_SIZE = 256
+
+
+class DataStore:
+    """Dataset plus the slices derived from it, rebuilt whenever the source file changes."""
+
+    def __init__(self, indicator=DEFAULT_INDICATOR, cache_size=CACHE_SIZE):
+        self.indicator = indicator
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._version = None
+        # Bumped on every reload; responses built from an older generation are not cached
+        self._generation = 0
+        self._responses = OrderedDict()
+
+    def source_path(self):
+        if os.path.exists(PARQUET_PATH) and has_pyarrow():
+            return PARQUET_PATH
+        return DATA_PATH
+
+    def refresh(self):
+        """Reload if the source file changed since the last load; returns True on reload."""
+        path = self.source_path()
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Файл {path} не найден.")
+        stat = os.stat(path)
+        version = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if version == self._version:
+                return False
+            df = load_map_data(map_columns(self.indicator))
+            self.panel = map_panel(df, self.indicator)
+            self.grids = frame_grids(self.panel, list(COLOR_MAP.keys()), self.indicator)
+            self.history = build_country_history(self.panel)
+            self._responses.clear()
+            self._generation += 1
+            self._version = version
+            print(f"Loaded {len(df)} rows from {path}")
+            return True
+
+    def cached(self, key, build):
+        """
+        (body, content_type, etag) for `key`, built once per dataset version and LRU-evicted.
+        Misses (build returns a None body) are not cached, and neither is a response
+        whose build overlapped a reload: it is served once but may mix both versions.
+        """
+        with self._lock:
+            if key in self._responses:
+                self._responses.move_to_end(key)
+                return self._responses[key]
+            generation = self._generation
+        body, content_type = build()
+        if body is None:
+            return None, None, None
+        entry = (body, content_type, '"' + hashlib.sha1(body).hexdigest()[:20] + '"')
+        with self._lock:
+            if generation != self._generation:
+                return entry
+            self._responses[key] = entry
+            while len(self._responses) > self.cache_size:
+                self._responses.popitem(last=False)
+        return entry
+
+    def years(self):
+        return self.grids["years"]
+
+    def frames(self):
+        return encode_frames(self.grids)
+
+    def frame(self, year):
+        return encode_year(self.grids, year)
+
+    def country(self, iso):
+        entry = self.history.get(iso)
+        return None if entry is None else history_record(entry)
+
+    def page(self):
+        """Dashboard shell: first year inline, later years and histories fetched from this server."""
+        page = io.BytesIO()
+        generate_map(self.panel, output_file=page, indicator=self.indicator,
+                     frames_url="/api/frame/", history_url="/api/history/")
+        return page.getvalue()
+
+
+def _json_body(value):
+    return json.dumps(value, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
+class DashboardHandler(BaseHTTPRequestHandler):
+    store = None
+
+    routes = [
+        (re.compile(r"^/$"), "page"),
+        (re.compile(r"^/api/years$"), "years"),
+        (re.compile(r"^/api/frame/(\d+)$"), "frame"),
+        (re.compile(r"^/api/frames$"), "frames"),
+        (re.compile(r"^/api/history/([A-Za-z0-9]+)(?:\.json)?$"), "country"),
+    ]
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        for pattern, name in self.routes:
+            match = pattern.match(path)
+            if match:
+                break
+        else:
+            return self.send_error(404)
+
+        try:
+            self.store.refresh()
+        except FileNotFoundError as e:
+            return self.send_error(503, str(e))
+
+        def build():
+            if name == "page":
+                return self.store.page(), "text/html; charset=utf-8"
+            if name == "frame":
+                value = self.store.frame(int(match.group(1)))
+            elif name == "country":
+                value = self.store.country(match.group(1).upper())
+            else:
+                value = getattr(self.store, name)()
+            return (None if value is None else _json_body(value)), "application/json"
+
+        body, content_type, etag = self.store.cached(path, build)
+        if body is None:
+            return self.send_error(404)
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        sys.stderr.write(f"{self.address_string()} {format % args}\n")
+
+
+def serve(host=HOST, port=PORT, indicator=DEFAULT_INDICATOR, cache_size=CACHE_SIZE):
+    store = DataStore(indicator, cache_size)
+    store.refresh()
+    handler = type("Handler", (DashboardHandler,), {"store": store})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Serving dashboard on http://{host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the dashboard and its data slices locally.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--indicator", default=DEFAULT_INDICATOR, choices=list(INDICATORS))
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE, help="number of cached responses")
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.indicator, args.cache_size)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""The streaming path (chunked reads, out-of-core join) must produce the same rows, in the same order, as the in-memory one."""
+import os
+
+import pandas as pd
+import pandas.testing as tm
+import pytest
+
+import data_processor
+import iso_resolver
+from join_engine import join_frames
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GDP_FILE = os.path.join(ROOT, "datasets", "gdp_1960_2020.csv")
+INFLATION_FILE = os.path.join(ROOT, "datasets", "global_inflation_data.csv")
+# Small enough that the bundled GDP file is read in several chunks
+CHUNK_SIZE = 2_000
+
+
+@pytest.fixture(autouse=True)
+def iso_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(iso_resolver, "CACHE_PATH", str(tmp_path / "iso3_cache.json"))
+
+
+def as_plain(df):
+    """Categorical columns as strings and a fresh index, so both paths compare value for value."""
+    df = df.reset_index(drop=True)
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(object)
+    return df
+
+
+def test_process_gdp_streaming_matches_in_memory():
+    streamed = data_processor.process_gdp(data_processor.load_gdp_streaming(GDP_FILE, CHUNK_SIZE))
+    in_memory = data_processor.process_gdp(pd.read_csv(GDP_FILE))
+    tm.assert_frame_equal(as_plain(streamed), as_plain(in_memory), check_dtype=False)
+
+
+def test_shared_name_keeps_categorical_order(tmp_path):
+    # Dominica appears twice in 1981; the larger row becomes the Dominican Republic
+    path = tmp_path / "gdp.csv"
+    pd.DataFrame({
+        'country': ['Dominica', 'Dominica', 'Zambia', 'Dominica', 'Zambia'],
+        'year': [1980, 1981, 1981, 1981, 1982],
+        'gdp': [1.0, 2.0, 5.0, 9.0, 6.0],
+        'state': ['America', 'America', 'Africa', 'America', 'Africa'],
+    }).to_csv(path, index=False)
+    streamed = data_processor.process_gdp(data_processor.load_gdp_streaming(path, chunksize=2))
+    in_memory = data_processor.process_gdp(pd.read_csv(path))
+    assert as_plain(streamed)['Country'].tolist() == ['Dominica', 'Dominica', 'Dominican Republic', 'Zambia', 'Zambia']
+    tm.assert_frame_equal(as_plain(streamed), as_plain(in_memory), check_dtype=False)
+
+
+def test_merged_output_streaming_matches_in_memory():
+    def final(gdp, inflation, chunksize=None):
+        gdp_clean = data_processor.process_gdp(gdp)
+        inflation_clean = data_processor.process_inflation(inflation)
+        return data_processor.finalize_data(data_processor.merge_data(gdp_clean, inflation_clean, chunksize))
+
+    # As cli.py process --streaming runs it: chunked reads and the out-of-core join
+    streamed = final(data_processor.load_gdp_streaming(GDP_FILE, CHUNK_SIZE),
+                     data_processor.load_inflation_streaming(INFLATION_FILE, CHUNK_SIZE), CHUNK_SIZE)
+    in_memory = final(pd.read_csv(GDP_FILE), pd.read_csv(INFLATION_FILE))
+    tm.assert_frame_equal(as_plain(streamed), as_plain(in_memory), check_dtype=False)
+
+
+def test_out_of_core_join_matches_join_frames():
+    gdp = data_processor.process_gdp(data_processor.load_gdp_streaming(GDP_FILE, CHUNK_SIZE))
+    inflation = data_processor.process_inflation(data_processor.load_inflation_streaming(INFLATION_FILE))
+    # Duplicate inflation keys expand like pd.merge and keep their order
+    inflation = pd.concat([inflation, inflation.iloc[::7].assign(Inflation=-1.0)], ignore_index=True)
+    expected = join_frames([gdp, inflation], on=('Country', 'Year'), how='inner')
+    tm.assert_frame_equal(data_processor.join_out_of_core(gdp, inflation, chunksize=500), expected)
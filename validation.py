@@ -0,0 +1,349 @@
+"""
+Screening of the processed GDP and inflation frames before they are merged.
+
+Checks are column expressions over a whole frame (duplicated(), boolean masks, one
+groupby for coverage), so their cost doesn't grow with the number of problems found.
+The exception is check_unmatched_names: its difflib spelling suggestion is a Python
+loop over the names missing from the other source. Checks run in order, errors
+first, and return the offending rows, which the report keeps:
+
+    report = validate_inputs(gdp_clean, inflation_clean, gdp_raw=gdp, inflation_raw=inflation)
+    print(report.summary())
+    report.write_json("validation_report.json")
+
+Reports are cached in .cache/validation/ keyed by a hash of the input frames and of
+this module's code. With fail_fast=True, the first check that reports an error
+raises ValidationError instead of running the remaining checks.
+"""
+import difflib
+import hashlib
+import json
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+
+import iso_resolver
+from instrumentation import instrumented
+from pipeline import code_digest
+
+CACHE_DIR = ".cache/validation"
+KEYS = ['Country', 'Year']
+
+GDP_GROWTH_BOUNDS = (-80.0, 200.0)  # nominal GDP change in percent; outside is an implausible jump
+INFLATION_BOUNDS = (-30.0, 1000.0)  # percent; outside is screened as an outlier
+MIN_COVERAGE = 0.5                  # share of the years in the inputs a country should have values for
+REPORT_ROWS = 50                    # offending rows per check written by to_dict()
+
+ERROR = "error"
+WARNING = "warning"
+
+
+class ValidationError(ValueError):
+    """Raised in fail-fast mode when a check reports an error."""
+
+    def __init__(self, report):
+        super().__init__(report.summary())
+        self.report = report
+
+
+class Issue:
+    def __init__(self, check, severity, message, rows):
+        self.check = check
+        self.severity = severity
+        self.message = message
+        self.rows = rows.reset_index(drop=True)  # offending rows, with a Source column
+
+    def to_dict(self, max_rows=REPORT_ROWS):
+        rows = self.rows.head(max_rows).astype(object)
+        return {
+            "check": self.check,
+            "severity": self.severity,
+            "message": self.message,
+            "count": len(self.rows),
+            "rows": rows.where(rows.notna(), None).to_dict(orient="records"),
+        }
+
+
+class ValidationReport:
+    def __init__(self, issues, checks_run, rows_checked, complete=True):
+        self.issues = issues
+        self.checks_run = checks_run
+        self.rows_checked = rows_checked
+        self.complete = complete  # False when fail-fast stopped before the last check
+
+    @property
+    def errors(self):
+        return [issue for issue in self.issues if issue.severity == ERROR]
+
+    @property
+    def warnings(self):
+        return [issue for issue in self.issues if issue.severity == WARNING]
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def issue(self, check):
+        return next((issue for issue in self.issues if issue.check == check), None)
+
+    def summary(self):
+        lines = [f"{issue.severity.upper()} {issue.check}: {issue.message}" for issue in self.issues]
+        stopped = "" if self.complete else " (stopped at the first error)"
+        lines.append(f"{self.rows_checked} input rows, {len(self.checks_run)} checks{stopped}: "
+                     f"{len(self.errors)} error(s), {len(self.warnings)} warning(s)")
+        return "\n".join(lines)
+
+    def to_dict(self, max_rows=REPORT_ROWS):
+        return {
+            "ok": self.ok,
+            "complete": self.complete,
+            "rows_checked": self.rows_checked,
+            "checks_run": self.checks_run,
+            "issues": [issue.to_dict(max_rows) for issue in self.issues],
+        }
+
+    def write_json(self, path, max_rows=REPORT_ROWS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(max_rows), f, ensure_ascii=False, indent=1, default=str)
+        os.replace(tmp_path, path)
+
+
+def _examples(names, limit=5):
+    names = [str(name) for name in pd.unique(np.asarray(names, dtype=object))]
+    more = f", +{len(names) - limit} more" if len(names) > limit else ""
+    return ", ".join(names[:limit]) + more
+
+
+def _with_source(source, frame):
+    return frame.assign(Source=source)[['Source'] + list(frame.columns)]
+
+
+# --- checks ------------------------------------------------------------------
+# Each check takes the inputs dict and returns (message, offending rows) or None.
+
+def check_duplicate_keys(inputs):
+    """Rows sharing a (Country, Year) key in one source; the join would multiply them."""
+    parts = []
+    for source, columns in (("gdp", ['GDP', 'GDP_Growth']), ("inflation", ['Inflation'])):
+        frame = inputs[source]
+        parts.append(_with_source(source, frame.loc[frame.duplicated(KEYS, keep=False), KEYS + columns]))
+    rows = pd.concat(parts, ignore_index=True)
+    if rows.empty:
+        return None
+    return f"{len(rows)} rows share a (Country, Year) key ({_examples(rows['Country'])})", rows
+
+
+def check_iso_collisions(inputs):
+    """Different names in one source resolving to the same ISO code, e.g. Niger and Nigeria."""
+    iso = inputs["iso"]
+    parts = []
+    for source in ("gdp", "inflation"):
+        names = pd.Series(pd.unique(inputs[source]['Country'].dropna().astype(str)))
+        codes = names.map(iso)
+        shared = codes.notna() & codes.duplicated(keep=False)
+        parts.append(_with_source(source, pd.DataFrame({'Country': names[shared], 'ISO_Code': codes[shared]})))
+    rows = pd.concat(parts, ignore_index=True).sort_values(['Source', 'ISO_Code'], kind='stable')
+    if rows.empty:
+        return None
+    pairs = rows.groupby(['Source', 'ISO_Code'], sort=False)['Country'].agg(" / ".join)
+    return f"{len(pairs)} ISO codes are shared by several names ({_examples(pairs)})", rows
+
+
+def check_coerced_values(inputs):
+    """Raw cells that are present but not numeric, which processing silently turns into NaN."""
+    parts = []
+    raw = inputs.get("gdp_raw")
+    if raw is not None and 'gdp' in raw.columns:
+        values = raw['gdp']
+        bad = values.notna() & pd.to_numeric(values, errors='coerce').isna()
+        parts.append(pd.DataFrame({'Source': "gdp", 'Country': raw.loc[bad, 'country'],
+                                   'Column': 'gdp', 'Value': values[bad]}))
+    raw = inputs.get("inflation_raw")
+    if raw is not None:
+        # Numeric columns cannot hold markers; only text year columns need the coercion test
+        for column in raw.columns:
+            if not str(column).strip().isdigit() or pd.api.types.is_numeric_dtype(raw[column]):
+                continue
+            values = raw[column]
+            bad = values.notna() & pd.to_numeric(values, errors='coerce').isna()
+            if bad.any():
+                parts.append(pd.DataFrame({'Source': "inflation", 'Country': raw.loc[bad, 'country_name'],
+                                           'Column': str(column), 'Value': values[bad]}))
+    rows = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    if rows.empty:
+        return None
+    return f"{len(rows)} non-numeric values coerced to NaN ({_examples(rows['Value'])})", rows
+
+
+def check_unmatched_names(inputs):
+    """
+    Names present in only one source, dropped by the inner join; likely typos get a
+    suggestion. The difflib search runs once per missing name (a few dozen here).
+    """
+    gdp_names = pd.unique(inputs["gdp"]['Country'].dropna().astype(str))
+    inflation_names = pd.unique(inputs["inflation"]['Country'].dropna().astype(str))
+    parts = []
+    for source, names, others in (("gdp", gdp_names, inflation_names), ("inflation", inflation_names, gdp_names)):
+        missing = sorted(set(names) - set(others))
+        others = [str(name) for name in others]
+        suggestions = [next(iter(difflib.get_close_matches(name, others, n=1, cutoff=0.75)), None) for name in missing]
+        parts.append(pd.DataFrame({'Source': source, 'Country': missing, 'Suggestion': suggestions}))
+    rows = pd.concat(parts, ignore_index=True)
+    if rows.empty:
+        return None
+    gdp_only = rows[rows['Source'] == "gdp"]
+    return (f"{len(gdp_only)} GDP and {len(rows) - len(gdp_only)} inflation names have no match in the "
+            f"other source ({_examples(gdp_only['Country'])})"), rows
+
+
+def check_unmapped_iso(inputs):
+    """Names without an ISO-3 code; their rows are dropped before the map is drawn."""
+    iso = inputs["iso"]
+    parts = []
+    for source in ("gdp", "inflation"):
+        counts = inputs[source]['Country'].astype(str).value_counts(sort=False)
+        unmapped = counts[counts.index.map(iso).isna()]
+        parts.append(pd.DataFrame({'Source': source, 'Country': unmapped.index, 'Rows': unmapped.to_numpy()}))
+    rows = pd.concat(parts, ignore_index=True)
+    if rows.empty:
+        return None
+    return f"{rows['Country'].nunique()} names have no ISO-3 code ({_examples(rows['Country'])})", rows
+
+
+def check_gdp_jumps(inputs):
+    """Year-over-year GDP changes outside GDP_GROWTH_BOUNDS, and non-positive GDP."""
+    gdp = inputs["gdp"]
+    low, high = GDP_GROWTH_BOUNDS
+    growth = gdp['GDP_Growth'].to_numpy(dtype="float64", na_value=np.nan)
+    level = gdp['GDP'].to_numpy(dtype="float64", na_value=np.nan)
+    with np.errstate(invalid="ignore"):
+        bad = (growth < low) | (growth > high) | (level <= 0)
+    rows = _with_source("gdp", gdp.loc[bad, KEYS + ['GDP', 'GDP_Growth']])
+    if rows.empty:
+        return None
+    return (f"{len(rows)} GDP changes outside {low:g}%..{high:g}% or non-positive GDP "
+            f"({_examples(rows['Country'])})"), rows
+
+
+def check_inflation_outliers(inputs):
+    """Inflation outside INFLATION_BOUNDS (may be genuine hyperinflation; worth a look)."""
+    inflation = inputs["inflation"]
+    low, high = INFLATION_BOUNDS
+    values = inflation['Inflation'].to_numpy(dtype="float64", na_value=np.nan)
+    with np.errstate(invalid="ignore"):
+        bad = (values < low) | (values > high)
+    rows = _with_source("inflation", inflation.loc[bad, KEYS + ['Inflation']])
+    if rows.empty:
+        return None
+    return f"{len(rows)} inflation values outside {low:g}%..{high:g}% ({_examples(rows['Country'])})", rows
+
+
+def check_coverage_gaps(inputs):
+    """Countries with missing years between their first and last value, or low overall coverage."""
+    years = pd.concat([inputs["gdp"]['Year'], inputs["inflation"]['Year']])
+    span = int(years.max() - years.min() + 1) if len(years) else 0
+    parts = []
+    for source, column in (("gdp", 'GDP'), ("inflation", 'Inflation')):
+        frame = inputs[source]
+        countries = frame['Country'].astype(str)
+        valid = frame[column].notna().to_numpy()
+        stats = frame.loc[valid, 'Year'].groupby(countries[valid]).agg(['min', 'max', 'nunique'])
+        stats = stats.reindex(pd.unique(countries))
+        with_values = stats['nunique'].fillna(0).astype(int)
+        gaps = (stats['max'] - stats['min'] + 1 - stats['nunique']).fillna(0).astype(int)
+        coverage = with_values / span if span else with_values * 0.0
+        bad = (gaps > 0) | (coverage < MIN_COVERAGE)
+        parts.append(pd.DataFrame({
+            'Source': source, 'Country': stats.index[bad],
+            'First_Year': stats['min'][bad].to_numpy(), 'Last_Year': stats['max'][bad].to_numpy(),
+            'Years': with_values[bad].to_numpy(), 'Gaps': gaps[bad].to_numpy(),
+            'Coverage': coverage[bad].round(3).to_numpy(),
+        }))
+    rows = pd.concat(parts, ignore_index=True)
+    if rows.empty:
+        return None
+    gapped = int((rows['Gaps'] > 0).sum())
+    return (f"{gapped} country series have interior gaps and {len(rows) - gapped} more cover under "
+            f"{MIN_COVERAGE:.0%} of {span} years ({_examples(rows['Country'])})"), rows
+
+
+# Errors first, so fail-fast stops before the cheaper-to-ignore warnings are computed
+CHECKS = [
+    ("duplicate_keys", ERROR, check_duplicate_keys),
+    ("iso_collisions", ERROR, check_iso_collisions),
+    ("coerced_values", WARNING, check_coerced_values),
+    ("unmatched_names", WARNING, check_unmatched_names),
+    ("unmapped_iso", WARNING, check_unmapped_iso),
+    ("gdp_jumps", WARNING, check_gdp_jumps),
+    ("inflation_outliers", WARNING, check_inflation_outliers),
+    ("coverage_gaps", WARNING, check_coverage_gaps),
+]
+
+
+def _frame_digest(digest, frame):
+    if frame is None:
+        digest.update(b"none")
+        return
+    digest.update("\x1f".join(map(str, frame.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+
+
+def _cache_key(frames):
+    digest = hashlib.sha256(code_digest(sys.modules[__name__], iso_resolver).encode())
+    digest.update(repr((GDP_GROWTH_BOUNDS, INFLATION_BOUNDS, MIN_COVERAGE)).encode())
+    for frame in frames:
+        _frame_digest(digest, frame)
+    return digest.hexdigest()
+
+
+def _iso_lookup(*frames):
+    names = pd.Series(pd.unique(pd.concat([frame['Country'].astype(str) for frame in frames])))
+    return dict(zip(names, iso_resolver.resolve_iso3(names)))
+
+
+@instrumented("validate_inputs")
+def validate_inputs(gdp_df, inflation_df, gdp_raw=None, inflation_raw=None, fail_fast=False, cache_dir=CACHE_DIR):
+    """
+    Run CHECKS on the outputs of process_gdp() / process_inflation() (and, when given,
+    the raw frames they came from) and return a ValidationReport. fail_fast=True raises
+    ValidationError at the first error. cache_dir=None disables the report cache.
+    """
+    path = None
+    if cache_dir:
+        path = os.path.join(cache_dir, f"{_cache_key([gdp_df, inflation_df, gdp_raw, inflation_raw])}.pkl")
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    report = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+                report = None
+            if report is not None:
+                if fail_fast and report.errors:
+                    raise ValidationError(report)
+                return report
+
+    inputs = {"gdp": gdp_df, "inflation": inflation_df, "gdp_raw": gdp_raw, "inflation_raw": inflation_raw,
+              "iso": _iso_lookup(gdp_df, inflation_df)}
+    issues, checks_run = [], []
+    for name, severity, check in CHECKS:
+        checks_run.append(name)
+        found = check(inputs)
+        if found is None:
+            continue
+        issues.append(Issue(name, severity, *found))
+        if fail_fast and severity == ERROR:
+            raise ValidationError(ValidationReport(issues, checks_run, len(gdp_df) + len(inflation_df), complete=False))
+
+    report = ValidationReport(issues, checks_run, len(gdp_df) + len(inflation_df))
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(report, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    return report
@@ -1,18 +1,25 @@
-import kagglehub
-import os
+import argparse
+
+from dataset_registry import DATASETS, KaggleSource, LocalDirSource, fetch_all
 
 print("Starting download script...")
 
-try:
-    # Download latest version
-    print("Downloading GDP data...")
-    path_gdp = kagglehub.dataset_download("holoong9291/gdp-of-all-countries19602020")
-    print("Path to GDP dataset files:", path_gdp)
+parser = argparse.ArgumentParser(description="Fetch the raw datasets into the local cache.")
+parser.add_argument("--source", choices=["auto", "local", "kaggle"], default="auto",
+                    help="auto: cache, then bundled datasets/, then Kaggle; local/kaggle: fetch again from that source")
+parser.add_argument("--local-dir", default="datasets", help="directory used by the local source")
+args = parser.parse_args()
 
-    # Download latest version
-    print("Downloading Inflation data...")
-    path_inflation = kagglehub.dataset_download("sazidthe1/global-inflation-data")
-    print("Path to Inflation dataset files:", path_inflation)
+sources = {
+    "auto": [LocalDirSource(args.local_dir), KaggleSource()],
+    "local": [LocalDirSource(args.local_dir)],
+    "kaggle": [KaggleSource()],
+}[args.source]
+
+try:
+    # With auto, already-cached datasets with a matching checksum are not fetched again
+    for name, path in fetch_all(list(DATASETS), sources, refresh=args.source != "auto").items():
+        print(f"Path to {name} dataset file:", path)
 
 except Exception as e:
-    print(f"An error occurred: {e}")
\ No newline at end of file
+    print(f"An error occurred: {e}")